@@ -1,6 +1,23 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from rest_framework.authtoken.models import Token
+
+        from api import signals
+        from recipes.models import Ingredient, Tag
+        from users.models import User
+
+        post_save.connect(signals.bump_ingredients_version, sender=Ingredient)
+        post_delete.connect(
+            signals.bump_ingredients_version, sender=Ingredient)
+        post_save.connect(signals.bump_tags_version, sender=Tag)
+        post_delete.connect(signals.bump_tags_version, sender=Tag)
+        post_delete.connect(signals.invalidate_cached_token, sender=Token)
+        post_save.connect(signals.invalidate_cached_user, sender=User)
+        post_delete.connect(signals.invalidate_cached_user, sender=User)
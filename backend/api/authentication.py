@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+
+
+def get_token_cache_key(key):
+    return f"auth:token:{key}"
+
+
+def get_user_cache_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+def invalidate_token(key):
+    cache.delete(get_token_cache_key(key))
+
+
+def invalidate_user(user_id):
+    """Удаляет из кеша токен пользователя и самого пользователя."""
+
+    key = cache.get(get_user_cache_key(user_id))
+    if key is not None:
+        cache.delete_many(
+            [get_token_cache_key(key), get_user_cache_key(user_id)])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Аутентификация по токену с кешированием пары пользователь-токен.
+
+    Запись живет AUTH_TOKEN_CACHE_TIMEOUT секунд и удаляется сигналами
+    при удалении токена (выход) и сохранении пользователя (смена пароля,
+    блокировка). Включается в настройках только при общем кеше
+    (SHARED_CACHE), чтобы сброс доходил до всех процессов."""
+
+    def authenticate_credentials(self, key):
+        credentials = cache.get(get_token_cache_key(key))
+        if credentials is None:
+            credentials = super().authenticate_credentials(key)
+            user = credentials[0]
+            cache.set_many({
+                get_token_cache_key(key): credentials,
+                get_user_cache_key(user.id): key,
+            }, settings.AUTH_TOKEN_CACHE_TIMEOUT)
+        return credentials
@@ -0,0 +1,313 @@
+import json
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import timedelta
+from io import StringIO
+from itertools import islice, product
+from pathlib import Path
+from random import Random
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.db import connection, reset_queries
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from recipes import shopping_list, timeline
+from recipes.models import (Favorite, Ingredient, IngredientRecipe,
+                            Recipe, RecipeScore, ShoppingCart,
+                            ShoppingListItem, SimilarRecipe, Tag,
+                            TimelineEntry)
+from recipes.scores import update_scores
+from recipes.search import update_search_vectors
+from users.models import Follow, User
+
+BATCH_SIZE = 5000
+BUDGET_PATH = Path(__file__).with_name("benchmark_budget.json")
+INGREDIENTS_PATH = settings.BASE_DIR.parent / "data" / "ingredients.csv"
+ACTIVITY_DAYS = 60
+POPULAR_AUTHORS = 10
+POPULAR_SHARE = 0.3
+TAGS = (("Завтрак", "#E26C2D", "breakfast"),
+        ("Обед", "#49B64E", "lunch"),
+        ("Ужин", "#8775D2", "dinner"))
+SELECTIVE_SCAN_FRACTION = 0.1
+LARGE_TABLES = frozenset(model._meta.db_table for model in (
+    Recipe, Recipe.tags.through, IngredientRecipe, Favorite, ShoppingCart,
+    ShoppingListItem, SimilarRecipe, TimelineEntry, RecipeScore, Follow,
+    User))
+
+
+def bulk_create(model, objects):
+    """Создает объекты пачками, не держа весь набор в памяти."""
+
+    objects = iter(objects)
+    while True:
+        batch = list(islice(objects, BATCH_SIZE))
+        if not batch:
+            break
+        model.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def seed(users, recipes, follows, favorites, cart,
+         ingredients_path=INGREDIENTS_PATH, random_seed=0):
+    """Заполняет базу синтетическими данными для бенчмарка.
+
+    POPULAR_SHARE рецептов пишут POPULAR_AUTHORS популярных авторов.
+    Каждый пользователь подписан на одного из них, а корзина и начало
+    избранного заполняются его рецептами с первыми двумя тегами. Так
+    любое сочетание фильтров списка рецептов отдает полную страницу."""
+
+    rng = Random(random_seed)
+    call_command("load_ingredients", ingredients_path, verbosity=0,
+                 stdout=StringIO())
+    Tag.objects.bulk_create(
+        Tag(name=name, color=color, slug=slug)
+        for name, color, slug in TAGS)
+    password = make_password("benchmark")
+    bulk_create(User, (
+        User(username=f"user{i}", email=f"user{i}@example.com",
+             first_name="Имя", last_name="Фамилия", password=password)
+        for i in range(users)))
+    user_ids = list(User.objects.values_list("id", flat=True))
+    popular = user_ids[:POPULAR_AUTHORS]
+    bulk_create(Recipe, (
+        Recipe(name=f"Рецепт {i}", author_id=rng.choice(
+                   popular if rng.random() < POPULAR_SHARE else user_ids),
+               image="images/benchmark.png", text="Описание рецепта",
+               cooking_time=rng.randint(1, 120))
+        for i in range(recipes)))
+    recipe_ids = list(Recipe.objects.values_list("id", flat=True))
+    tag_ids = list(Tag.objects.values_list("id", flat=True))
+    ingredient_ids = list(Ingredient.objects.values_list("id", flat=True))
+    bulk_create(Recipe.tags.through, (
+        Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+        for recipe_id in recipe_ids
+        for tag_id in rng.sample(tag_ids, rng.randint(1, len(tag_ids)))))
+    bulk_create(IngredientRecipe, (
+        IngredientRecipe(recipe_id=recipe_id, ingredient_id=ingredient_id,
+                         amount=rng.randint(1, 500))
+        for recipe_id in recipe_ids
+        for ingredient_id in rng.sample(ingredient_ids, rng.randint(3, 10))))
+    chosen = {user_id: rng.choice(popular) for user_id in user_ids}
+    bulk_create(Follow, (
+        Follow(user_id=user_id, author_id=author_id)
+        for user_id in user_ids
+        for author_id in [chosen[user_id]] + rng.sample(user_ids, follows)
+        if author_id != user_id))
+    showcase = defaultdict(list)
+    for author_id, recipe_id in Recipe.objects.filter(
+            author_id__in=popular, tags__slug=TAGS[0][2]).filter(
+            tags__slug=TAGS[1][2]).values_list("author_id", "id"):
+        showcase[author_id].append(recipe_id)
+
+    overlap = {
+        user_id: rng.sample(showcase[author_id],
+                            min(cart, len(showcase[author_id])))
+        for user_id, author_id in chosen.items()}
+
+    def pick(user_id, count):
+        picked = overlap[user_id][:count]
+        picked += rng.sample(recipe_ids, count - len(picked))
+        return dict.fromkeys(picked)
+
+    now = timezone.now()
+    bulk_create(Favorite, (
+        Favorite(user_id=user_id, recipe_id=recipe_id,
+                 created=now - timedelta(
+                     seconds=rng.uniform(0, ACTIVITY_DAYS * 86400)))
+        for user_id in user_ids
+        for recipe_id in pick(user_id, favorites)))
+    bulk_create(ShoppingCart, (
+        ShoppingCart(user_id=user_id, recipe_id=recipe_id,
+                     created=now - timedelta(
+                         seconds=rng.uniform(0, ACTIVITY_DAYS * 86400)))
+        for user_id in user_ids
+        for recipe_id in pick(user_id, cart)))
+    shopping_list.rebuild()
+    update_search_vectors(Recipe.objects.all())
+    call_command("recount", verbosity=0, stdout=StringIO())
+    timeline.rebuild()
+    update_scores()
+    call_command("similar_recipes", verbosity=0, stdout=StringIO())
+
+
+def get_routes(user):
+    """Возвращает маршруты API с параметрами для замера.
+
+    Фильтры списка рецептов перебираются во всех сочетаниях."""
+
+    author = ShoppingCart.objects.filter(user=user).values(
+        "recipe__author_id").annotate(count=Count("id")).order_by(
+        "-count").values_list("recipe__author_id", flat=True).first()
+    recipe = Recipe.objects.filter(author=user).values_list(
+        "id", flat=True).first()
+    pantry = list(IngredientRecipe.objects.filter(
+        recipe_id=recipe).values_list("ingredient_id", flat=True))
+    routes = [
+        ("ingredients-list", "/api/ingredients/", {}),
+        ("ingredients-search", "/api/ingredients/", {"name": "мол"}),
+        ("tags-list", "/api/tags/", {}),
+        ("tags-detail", f"/api/tags/{Tag.objects.first().id}/", {}),
+        ("recipes-list-anonymous", "/api/recipes/", {}),
+        ("recipes-list-limit-50", "/api/recipes/", {"limit": 50}),
+        ("recipes-list-cursor", "/api/recipes/", {"cursor": ""}),
+        ("recipes-list-popular", "/api/recipes/", {"ordering": "popular"}),
+        ("recipes-list-trending", "/api/recipes/", {"ordering": "trending"}),
+        ("recipes-list-trending-cursor", "/api/recipes/",
+         {"ordering": "trending", "cursor": ""}),
+        ("recipes-list-popular-tags", "/api/recipes/",
+         {"ordering": "popular", "tags": ["breakfast"]}),
+        ("recipes-search", "/api/recipes/", {"search": "творог"}),
+        ("recipes-search-tags", "/api/recipes/",
+         {"search": "творог -зернистый", "tags": ["breakfast"]}),
+        ("recipes-detail", f"/api/recipes/{recipe}/", {}),
+        ("recipes-similar", f"/api/recipes/{recipe}/similar/", {}),
+        ("recipes-pantry", "/api/recipes/pantry/", {"ingredients": pantry}),
+        ("recipes-pantry-max-missing", "/api/recipes/pantry/",
+         {"ingredients": pantry, "max_missing": 2}),
+        ("recipes-download-shopping-cart",
+         "/api/recipes/download_shopping_cart/", {}),
+        ("recipes-feed", "/api/recipes/feed/", {}),
+        ("recipes-feed-before", "/api/recipes/feed/",
+         {"before": recipe, "limit": 50}),
+        ("users-list", "/api/users/", {}),
+        ("users-detail", f"/api/users/{author}/", {}),
+        ("users-me", "/api/users/me/", {}),
+        ("users-subscriptions", "/api/users/subscriptions/", {}),
+        ("users-subscriptions-recipes-limit", "/api/users/subscriptions/",
+         {"recipes_limit": 3}),
+        ("users-subscriptions-cursor", "/api/users/subscriptions/",
+         {"cursor": "", "recipes_limit": 3}),
+    ]
+    filters = (("author", author), ("tags", ["breakfast", "lunch"]),
+               ("is_favorited", 1), ("is_in_shopping_cart", 1))
+    for mask in product((False, True), repeat=len(filters)):
+        params = dict(item for item, used in zip(filters, mask) if used)
+        name = "-".join(["recipes-list"] + list(params))
+        routes.append((name, "/api/recipes/", params))
+    return routes
+
+
+def find_seq_scans(plan, sizes):
+    """Возвращает большие таблицы, которые план читает целиком ради
+    небольшой доли строк.
+
+    sizes - оценка числа строк в таблицах. Просмотр без фильтра или с
+    фильтром, под который попадает большая часть таблицы (например,
+    COUNT по популярному тегу), индексом не ускорить, он не считается."""
+
+    tables = []
+    if (plan["Node Type"] == "Seq Scan" and "Filter" in plan
+            and plan["Relation Name"] in sizes
+            and plan["Plan Rows"]
+            < sizes[plan["Relation Name"]] * SELECTIVE_SCAN_FRACTION):
+        tables.append(plan["Relation Name"])
+    for child in plan.get("Plans", ()):
+        tables += find_seq_scans(child, sizes)
+    return tables
+
+
+def explain(queries):
+    """Выполняет EXPLAIN для SELECT-запросов, работает только в PostgreSQL."""
+
+    tables = set()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT relname, reltuples FROM pg_class WHERE relname = ANY(%s)",
+            [list(LARGE_TABLES)])
+        sizes = dict(cursor.fetchall())
+        for sql in queries:
+            if not sql.lstrip().upper().startswith(("SELECT", "WITH")):
+                continue
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+            tables.update(
+                find_seq_scans(cursor.fetchone()[0][0]["Plan"], sizes))
+    return sorted(tables)
+
+
+def measure(client, path, params, repeat, with_explain=False):
+    """Замеряет число запросов к БД, время и пиковую память запроса.
+
+    Число запросов берется максимальное, то есть без учета кеша.
+    С with_explain планы запросов первого прогона проверяются на
+    последовательное чтение больших таблиц."""
+
+    def request():
+        response = client.get(path, params)
+        if response.streaming:
+            b"".join(response.streaming_content)
+        return response
+
+    timings, queries, sqls = [], 0, None
+    for _ in range(repeat):
+        reset_queries()
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = request()
+            timings.append(time.perf_counter() - start)
+        queries = max(queries, len(captured))
+        if sqls is None:
+            sqls = [query["sql"] for query in captured]
+    tracemalloc.start()
+    request()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    timings.sort()
+    result = {
+        "status": response.status_code,
+        "queries": queries,
+        "time_ms": round(timings[len(timings) // 2] * 1000, 2),
+        "max_time_ms": round(timings[-1] * 1000, 2),
+        "memory_kb": round(peak / 1024, 1),
+    }
+    if with_explain:
+        result["seq_scans"] = explain(sqls)
+    return result
+
+
+def run(repeat, with_explain=False,
+        anonymous_routes=("recipes-list-anonymous",)):
+    """Прогоняет все маршруты от имени самого активного пользователя."""
+
+    user = User.objects.filter(
+        follower__isnull=False, shoppingcart__isnull=False,
+        recipes__isnull=False).first()
+    authorized, anonymous = APIClient(), APIClient()
+    authorized.force_authenticate(user)
+    if with_explain:
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+    results = {}
+    for name, path, params in get_routes(user):
+        client = anonymous if name in anonymous_routes else authorized
+        results[name] = measure(client, path, params, repeat, with_explain)
+    return results
+
+
+def load_budget(path=BUDGET_PATH):
+    """Загружает бюджет запросов к БД по маршрутам."""
+
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def save_budget(results, path=BUDGET_PATH):
+    """Записывает текущее число запросов маршрутов как бюджет."""
+
+    budget = {name: {"queries": result["queries"]}
+              for name, result in results.items()}
+    Path(path).write_text(
+        json.dumps(budget, indent=2) + "\n", encoding="utf-8")
+
+
+def find_regressions(results, budget):
+    """Возвращает маршруты, превысившие бюджет запросов."""
+
+    return [
+        f'{name}: {result["queries"]} > {budget[name]["queries"]}'
+        for name, result in results.items()
+        if name in budget and result["queries"] > budget[name]["queries"]]
@@ -0,0 +1,102 @@
+import binascii
+import uuid
+from base64 import b64decode
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from PIL import Image, ImageFile
+from rest_framework.serializers import ImageField
+
+
+class RecipeImageField(ImageField):
+    """Изображение рецепта в виде data URI с base64.
+
+    Строка декодируется частями во временный файл, который переходит
+    на диск после SPOOL_SIZE байт, пробелы и переносы строк в base64
+    допускаются. Формат и размеры проверяются по заголовку изображения
+    до декодирования остальной части, слишком большие файлы
+    отклоняются еще до декодирования."""
+
+    CHUNK_SIZE = 64 * 1024
+    HEADER_SIZE = 256 * 1024
+    SPOOL_SIZE = 1024 * 1024
+    FORMATS = {"JPEG": "jpg", "PNG": "png", "GIF": "gif", "WEBP": "webp"}
+    MARKER = ";base64,"
+    WHITESPACE = " \t\r\n"
+
+    default_error_messages = {
+        "invalid_image": "Загрузите корректное изображение в base64.",
+        "max_size": "Размер изображения не должен превышать {max_size} МБ.",
+        "max_pixels": "Изображение слишком большого разрешения.",
+        "format": "Поддерживаются изображения JPEG, PNG, GIF и WebP.",
+    }
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str) or not data.startswith("data:image/"):
+            self.fail("invalid_image")
+        start = data.find(self.MARKER)
+        if start == -1:
+            self.fail("invalid_image")
+        start += len(self.MARKER)
+        length = len(data) - start - sum(
+            data.count(space, start) for space in self.WHITESPACE)
+        if length * 3 // 4 > settings.RECIPE_IMAGE_MAX_SIZE:
+            self.fail("max_size",
+                      max_size=settings.RECIPE_IMAGE_MAX_SIZE // 2 ** 20)
+        file = SpooledTemporaryFile(max_size=self.SPOOL_SIZE)
+        parser = ImageFile.Parser()
+        image_format = None
+        try:
+            for chunk in self.decode_chunks(data, start):
+                file.write(chunk)
+                if image_format is None:
+                    image_format = self.check_header(parser, chunk, file)
+            if image_format is None:
+                self.fail("invalid_image")
+            size = file.tell()
+            file.seek(0)
+            Image.open(file).verify()
+        except (binascii.Error, ValueError, OSError, SyntaxError):
+            file.close()
+            self.fail("invalid_image")
+        file.seek(0)
+        extension = self.FORMATS[image_format]
+        return UploadedFile(
+            file, name=f"{uuid.uuid4()}.{extension}",
+            content_type=f"image/{extension}", size=size)
+
+    def decode_chunks(self, data, start):
+        """Декодирует base64 с позиции start частями по CHUNK_SIZE.
+
+        Пробелы и переносы строк пропускаются, а символы, не добравшие
+        до группы из четырех, переходят в следующую часть."""
+
+        rest = ""
+        for offset in range(start, len(data), self.CHUNK_SIZE):
+            part = rest + "".join(
+                data[offset:offset + self.CHUNK_SIZE].split())
+            end = len(part) - len(part) % 4
+            rest = part[end:]
+            yield b64decode(part[:end])
+        if rest:
+            yield b64decode(rest)
+
+    def check_header(self, parser, chunk, file):
+        """Проверяет формат и разрешение, как только их можно прочитать.
+
+        Возвращает формат изображения или None, если заголовок еще
+        не получен целиком."""
+
+        parser.feed(chunk)
+        image = parser.image
+        if image is None:
+            if file.tell() > self.HEADER_SIZE:
+                self.fail("invalid_image")
+            return None
+        if image.format not in self.FORMATS:
+            self.fail("format")
+        width, height = image.size
+        if width * height > settings.RECIPE_IMAGE_MAX_PIXELS:
+            self.fail("max_pixels")
+        return image.format
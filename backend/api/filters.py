@@ -1,38 +1,109 @@
-from django_filters.rest_framework import (BooleanFilter, CharFilter,
-                                           FilterSet,
-                                           ModelMultipleChoiceFilter)
-from rest_framework.filters import SearchFilter
+from django.contrib.postgres.search import SearchRank
+from django.db.models import Exists, F, OuterRef
+from django_filters.rest_framework import BooleanFilter, CharFilter, FilterSet
+from rest_framework.filters import BaseFilterBackend
 
-from recipes.models import Recipe, Tag
+from recipes.models import Recipe
+from recipes.search import get_search_query
+from recipes.utils import get_name_words, get_words_query, normalize_name
 
 
-class IngredientFilter(SearchFilter):
-    """Фильтр для ингредиентов."""
+class IngredientFilter(BaseFilterBackend):
+    """Фильтр для ингредиентов.
+
+    Сначала выдает ингредиенты, название которых начинается с запроса,
+    затем те, в названии которых есть слова, начинающиеся со слов
+    запроса, но не больше limit штук. Первый шаг читает индекс по
+    search_name, второй - GIN-индекс по словам названия.
+    Применяется только к списку, отдельный ингредиент не фильтруется."""
 
     search_param = "name"
+    limit = 50
+
+    def filter_queryset(self, request, queryset, view):
+        name = normalize_name(request.query_params.get(self.search_param, ""))
+        if not name or view.action != "list":
+            return queryset
+        ingredients = list(
+            queryset.filter(search_name__startswith=name)[:self.limit])
+        query = get_words_query(name)
+        if len(ingredients) < self.limit and query is not None:
+            ingredients += queryset.annotate(
+                words=get_name_words()).filter(words=query).exclude(
+                search_name__startswith=name)[:self.limit - len(ingredients)]
+        return ingredients
 
 
 class RecipeFilter(FilterSet):
     """Фильтр для рецептов."""
     author = CharFilter()
-    tags = ModelMultipleChoiceFilter(field_name="tags__slug",
-                                     to_field_name="slug",
-                                     queryset=Tag.objects.all(),)
+    tags = CharFilter(method="get_tags")
     is_favorited = BooleanFilter(method="get_is_favorited")
     is_in_shopping_cart = BooleanFilter(method="get_is_in_shopping_cart")
+    search = CharFilter(method="get_search")
 
     class Meta:
         model = Recipe
-        fields = ("author", "tags", "is_favorited", "is_in_shopping_cart")
+        fields = ("author", "tags", "is_favorited", "is_in_shopping_cart",
+                  "search")
+
+    def get_tags(self, queryset, name, value):
+        """Рецепты хотя бы с одним из тегов по слагам.
+
+        Слаги сравниваются внутри подзапроса EXISTS, поэтому фильтр не
+        добавляет запросов. Неизвестные слаги не дают ошибку 400, а
+        просто ничего не находят."""
+
+        return queryset.filter(Exists(Recipe.tags.through.objects.filter(
+            recipe=OuterRef("pk"),
+            tag__slug__in=self.request.query_params.getlist(name))))
 
     def get_is_favorited(self, queryset, name, value):
         user = self.request.user
         if value and user.is_authenticated:
-            return queryset.filter(favorite__user=user)
+            return queryset.filter(is_favorited=True)
         return queryset
 
     def get_is_in_shopping_cart(self, queryset, name, value):
         user = self.request.user
         if value and user.is_authenticated:
-            return queryset.filter(shoppingcart__user=user)
+            return queryset.filter(is_in_shopping_cart=True)
         return queryset
+
+    def get_search(self, queryset, name, value):
+        """Полнотекстовый поиск по названию, ингредиентам и описанию.
+
+        Совпадения ищутся по GIN-индексу, самые релевантные идут первыми."""
+
+        query = get_search_query(value)
+        return queryset.filter(search_vector=query).annotate(
+            rank=SearchRank(F("search_vector"), query)).order_by(
+            "-rank", "-id")
+
+
+class RecipeOrderingFilter(BaseFilterBackend):
+    """Сортировка рецептов по популярности или трендам.
+
+    Оценки берутся из таблицы RecipeScore, строка в ней есть у каждого
+    рецепта. Внутреннее соединение позволяет читать страницу по индексу
+    оценки, поэтому она стоит столько же, сколько страница по id.
+    Курсор идет по паре (оценка, id), поэтому листается и при
+    одинаковых оценках. Без параметра порядок не меняется, курсор идет
+    по -id."""
+
+    ordering_param = "ordering"
+    fields = {"popular": "score__popular", "trending": "score__trending"}
+    default_ordering = ("-id",)
+
+    def get_ordering(self, request, queryset, view):
+        if request.query_params.get(self.ordering_param) in self.fields:
+            return ("-ranking", "-id")
+        return self.default_ordering
+
+    def filter_queryset(self, request, queryset, view):
+        field = self.fields.get(request.query_params.get(self.ordering_param))
+        if field is None:
+            return queryset
+        return queryset.filter(score__isnull=False).annotate(
+            ranking=F(field)).order_by(
+            *self.get_ordering(request, queryset, view))
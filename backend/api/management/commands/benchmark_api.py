@@ -0,0 +1,88 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (setup_test_environment,
+                               teardown_test_environment)
+
+from api import benchmark
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    """Бенчмарк эндпоинтов API на синтетических данных.
+
+    Данные создаются в отдельной тестовой базе. Если число запросов к БД
+    превышает бюджет, команда завершается с ошибкой."""
+
+    help = "Замеряет число запросов, время и память для маршрутов API."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=2000)
+        parser.add_argument("--recipes", type=int, default=5000)
+        parser.add_argument("--follows", type=int, default=20)
+        parser.add_argument("--favorites", type=int, default=20)
+        parser.add_argument("--cart", type=int, default=10)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument(
+            "--budget", type=Path, default=benchmark.BUDGET_PATH)
+        parser.add_argument("--output", type=Path)
+        parser.add_argument(
+            "--keepdb", action="store_true",
+            help="Не удалять тестовую базу и не заполнять ее повторно.")
+        parser.add_argument(
+            "--update-budget", action="store_true",
+            help="Записать текущее число запросов в файл бюджета.")
+        parser.add_argument(
+            "--explain", action="store_true",
+            help="Проверить планы запросов на последовательное чтение "
+                 "больших таблиц (только PostgreSQL).")
+
+    def handle(self, *args, **options):
+        if options["explain"] and connection.vendor != "postgresql":
+            raise CommandError("Проверка планов доступна только в PostgreSQL.")
+        setup_test_environment()
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False,
+            keepdb=options["keepdb"])
+        try:
+            if not Recipe.objects.exists():
+                benchmark.seed(
+                    options["users"], options["recipes"],
+                    options["follows"], options["favorites"],
+                    options["cart"])
+            results = benchmark.run(options["repeat"], options["explain"])
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=options["keepdb"])
+            teardown_test_environment()
+
+        report = json.dumps(results, ensure_ascii=False, indent=2)
+        if options["output"]:
+            options["output"].write_text(report, encoding="utf-8")
+        else:
+            self.stdout.write(report)
+
+        errors = []
+        if options["update_budget"]:
+            benchmark.save_budget(results, options["budget"])
+        else:
+            regressions = benchmark.find_regressions(
+                results, benchmark.load_budget(options["budget"]))
+            if regressions:
+                errors.append(
+                    "Превышен бюджет запросов:\n" + "\n".join(regressions))
+        seq_scans = [
+            f'{name}: {", ".join(result["seq_scans"])}'
+            for name, result in results.items() if result.get("seq_scans")]
+        if seq_scans:
+            errors.append(
+                "Последовательное чтение больших таблиц:\n"
+                + "\n".join(seq_scans))
+        if errors:
+            raise CommandError("\n".join(errors))
+        self.stdout.write(self.style.SUCCESS(
+            "Бюджет запросов обновлен." if options["update_budget"]
+            else "Бюджет запросов соблюден."))
@@ -0,0 +1,30 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from api import transfer
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    """Выгрузка рецептов в файл NDJSON, по рецепту на строку."""
+
+    help = "Выгружает рецепты в формате NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path", type=Path, nargs="?",
+            help="Файл для выгрузки, по умолчанию stdout.")
+        parser.add_argument(
+            "--author", help="Выгрузить только рецепты этого автора.")
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.all()
+        if options["author"]:
+            recipes = recipes.filter(author__username=options["author"])
+        if options["path"] is None:
+            for line in transfer.export_recipes(recipes):
+                self.stdout.write(line, ending="")
+            return
+        with open(options["path"], "w", encoding="utf-8") as file:
+            file.writelines(transfer.export_recipes(recipes))
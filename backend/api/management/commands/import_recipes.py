@@ -0,0 +1,72 @@
+import os
+import time
+from functools import partial
+from multiprocessing import get_context
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from api import transfer
+from users.models import User
+
+
+class Command(BaseCommand):
+    """Импорт рецептов из файла NDJSON.
+
+    Файл читается пачками, пачки обрабатываются параллельно в
+    нескольких процессах. Каждая строка - рецепт в формате команды
+    export_recipes, теги и ингредиенты задаются id."""
+
+    help = "Импортирует рецепты из файла NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", type=Path)
+        parser.add_argument(
+            "--author",
+            help="Автор рецептов, для которых author не указан.")
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count() or 1)
+        parser.add_argument(
+            "--batch-size", type=int, default=transfer.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        default_author_id = None
+        if options["author"]:
+            default_author_id = User.objects.filter(
+                username=options["author"]).values_list(
+                "id", flat=True).first()
+            if default_author_id is None:
+                raise CommandError("Автор не найден.")
+        import_chunk = partial(
+            transfer.import_chunk, catalog=transfer.load_catalog(),
+            default_author_id=default_author_id)
+        start = time.monotonic()
+        with open(options["path"], encoding="utf-8") as file:
+            chunks = transfer.read_chunks(file, options["batch_size"])
+            if options["workers"] > 1:
+                connections.close_all()
+                with get_context("fork").Pool(options["workers"]) as pool:
+                    processed, created = self.report(
+                        pool.imap_unordered(import_chunk, chunks))
+            else:
+                processed, created = self.report(map(import_chunk, chunks))
+        elapsed = time.monotonic() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Обработано строк: {processed}, создано рецептов: {created}, "
+            f"{processed / max(elapsed, 1e-6):.0f} строк/с."))
+
+    def report(self, results):
+        """Выводит прогресс после каждой пачки и ошибки по строкам."""
+
+        processed = created = failed = 0
+        for chunk_created, errors in results:
+            for number, messages in errors:
+                self.stderr.write(f"Строка {number}: {' '.join(messages)}")
+            processed += chunk_created + len(errors)
+            created += chunk_created
+            failed += len(errors)
+            self.stdout.write(
+                f"Обработано строк: {processed}, создано: {created}, "
+                f"ошибок: {failed}.")
+        return processed, created
@@ -0,0 +1,83 @@
+from hashlib import md5
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from api.serializers import BulkIdsSerializer
+from recipes.catalog import get_catalog_version
+
+
+class CatalogCacheMixin:
+    """Кеширует готовые ответы справочника.
+
+    Ключ кеша содержит версию справочника, которая обновляется
+    сигналами моделей, поэтому кеш может быть и локальным для процесса.
+    По ETag и Last-Modified клиент получает 304 Not Modified без
+    запросов к справочнику и без сериализации, а при общем кеше - и
+    без запросов к базе вообще. Прочитанная версия сохраняется в
+    catalog_version, чтобы обработчику не читать ее повторно."""
+
+    catalog = None
+    catalog_version = None
+    cache_timeout = 60 * 60 * 24
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            request, super().retrieve, *args, **kwargs)
+
+    def get_cached_response(self, request, view, *args, **kwargs):
+        if request.accepted_renderer.format != "json":
+            return view(request, *args, **kwargs)
+        version = self.catalog_version = get_catalog_version(self.catalog)
+        path = md5(request.get_full_path().encode()).hexdigest()
+        etag = f'"{version}-{path}"'
+        last_modified = int(version)
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+        key = f"catalog:{self.catalog}:{version}:{path}"
+        content = cache.get(key)
+        if content is None:
+            response = view(request, *args, **kwargs)
+            content = JSONRenderer().render(response.data)
+            cache.set(key, content, self.cache_timeout)
+        response = HttpResponse(content, content_type="application/json")
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        return response
+
+
+class BulkToggleMixin:
+    """Пакетное добавление и удаление связей пользователя с объектами.
+
+    Все id обрабатываются одним запросом на вставку или удаление, для
+    каждого id в ответе возвращается результат."""
+
+    def bulk_toggle(self, request, queryset, add, remove):
+        serializer = BulkIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data["ids"]
+        if request.method == "POST":
+            changed = {obj.id for obj in add(request.user.id, ids)}
+            done, skipped = "added", "already_added"
+        else:
+            changed = set(remove(request.user.id, ids))
+            done, skipped = "removed", "not_added"
+        missing = set(ids) - changed
+        if missing:
+            missing -= set(queryset.filter(
+                id__in=missing).values_list("id", flat=True))
+        return Response({"results": [
+            {"id": pk,
+             "status": done if pk in changed else
+             "not_found" if pk in missing else skipped}
+            for pk in ids]})
@@ -1,4 +1,7 @@
-from rest_framework.pagination import PageNumberPagination
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (Cursor, CursorPagination,
+                                       PageNumberPagination)
 
 
 class PageLimitPagination(PageNumberPagination):
@@ -6,3 +9,126 @@ class PageLimitPagination(PageNumberPagination):
 
     page_size_query_param = "limit"
     page_size = 6
+
+
+class LimitCursorPagination(CursorPagination):
+    """Курсорная пагинация по id без подсчета общего количества."""
+
+    page_size_query_param = "limit"
+    page_size = 6
+    ordering = "-id"
+
+
+class KeysetCursorPagination(LimitCursorPagination):
+    """Курсорная пагинация по всем полям сортировки.
+
+    Позиция курсора хранит значения всех полей через запятую, а
+    страница выбирается условием (поля) < (позиция) без смещения.
+    Поэтому она листается и при любом числе строк с одинаковой
+    оценкой. Позиция курсора по одному полю совпадает с позицией
+    CursorPagination."""
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        position = None if self.cursor is None else self.cursor.position
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(
+                field[1:] if field.startswith("-") else f"-{field}"
+                for field in ordering)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            try:
+                queryset = queryset.filter(
+                    self.get_position_filter(ordering, position))
+            except (TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_following = len(results) > len(self.page)
+        if reverse:
+            self.page.reverse()
+        self.has_next = position is not None if reverse else has_following
+        self.has_previous = has_following if reverse else (
+            position is not None)
+        if (self.has_previous or self.has_next) and self.template:
+            self.display_page_controls = True
+        return self.page
+
+    def get_position_filter(self, ordering, position):
+        """Условие для строк после позиции при сортировке ordering.
+
+        Первое поле дополнительно ограничено нестрогим условием, чтобы
+        база читала индекс по нему с позиции, а не целиком."""
+
+        values = position.split(",")
+        if len(values) > len(ordering):
+            raise ValueError(position)
+        lookups = [
+            (field.lstrip("-"), "lt" if field.startswith("-") else "gt")
+            for field in ordering[:len(values)]]
+        name, lookup = lookups[0]
+        condition = Q(**{f"{name}__{lookup}e": values[0]})
+        after = Q()
+        equal = {}
+        for (name, lookup), value in zip(lookups, values):
+            after |= Q(**equal, **{f"{name}__{lookup}": value})
+            equal[name] = value
+        return condition & after
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        position = self.cursor.position
+        if self.page:
+            position = self._get_position_from_instance(
+                self.page[-1], self.ordering)
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        position = self.cursor.position
+        if self.page:
+            position = self._get_position_from_instance(
+                self.page[0], self.ordering)
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=True, position=position))
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for field in ordering:
+            name = field.lstrip("-")
+            if isinstance(instance, dict):
+                values.append(instance[name])
+            else:
+                values.append(getattr(instance, name))
+        return ",".join(str(value) for value in values)
+
+
+class PageOrCursorPagination(PageLimitPagination):
+    """Постраничная пагинация, которая переключается на курсорную,
+    если в запросе есть параметр cursor (в том числе пустой)."""
+
+    cursor_pagination_class = KeysetCursorPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if self.cursor_pagination_class.cursor_query_param in (
+                request.query_params):
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
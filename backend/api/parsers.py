@@ -0,0 +1,18 @@
+import codecs
+
+from django.conf import settings
+from rest_framework.parsers import BaseParser
+
+
+class NDJSONParser(BaseParser):
+    """Отдает тело запроса NDJSON как поток строк.
+
+    Строки разбираются по мере чтения, поэтому большой файл не
+    загружается в память целиком."""
+
+    media_type = "application/x-ndjson"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        return codecs.getreader(encoding)(stream)
@@ -9,6 +9,13 @@ class IsAdminOrReadOnly(BasePermission):
                 or request.user.is_superuser)
 
 
+class IsAdmin(BasePermission):
+    """Права доступа только для администратора."""
+
+    def has_permission(self, request, view):
+        return request.user.is_superuser
+
+
 class IsAuthorOrReadOnly(BasePermission):
     """Права доступа для автора поста или только чтение."""
 
@@ -0,0 +1,64 @@
+import csv
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+
+class ShoppingListTextRenderer(BaseRenderer):
+    """Список покупок в виде текстового файла."""
+
+    media_type = "text/plain"
+    format = "txt"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if isinstance(data, dict):
+            data = "\n".join(f"{key}: {value}" for key, value in data.items())
+        return str(data).encode(self.charset)
+
+    def stream(self, ingredients):
+        yield "Список покупок:\n"
+        for ingredient in ingredients:
+            yield (f'\n{ingredient["ingredient__name"]} - '
+                   f'{ingredient["total"]} '
+                   f'{ingredient["ingredient__measurement_unit"]}')
+
+
+class Echo:
+    """Буфер для csv.writer, возвращающий записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+class ShoppingListCSVRenderer(ShoppingListTextRenderer):
+    """Список покупок в формате CSV."""
+
+    media_type = "text/csv"
+    format = "csv"
+
+    def stream(self, ingredients):
+        writer = csv.writer(Echo())
+        yield writer.writerow(
+            ("Ингредиент", "Количество", "Единица измерения"))
+        for ingredient in ingredients:
+            yield writer.writerow((ingredient["ingredient__name"],
+                                   ingredient["total"],
+                                   ingredient["ingredient__measurement_unit"]))
+
+
+class ShoppingListJSONRenderer(JSONRenderer):
+    """Список покупок в формате JSON."""
+
+    def stream(self, ingredients):
+        separator = "["
+        for ingredient in ingredients:
+            yield separator + json.dumps({
+                "name": ingredient["ingredient__name"],
+                "amount": ingredient["total"],
+                "measurement_unit": ingredient["ingredient__measurement_unit"],
+            }, ensure_ascii=False)
+            separator = ","
+        yield "]"
@@ -0,0 +1,188 @@
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+from heapq import nlargest, nsmallest
+from threading import Lock
+
+from api.serializers import IngredientSerializer
+from recipes.catalog import get_catalog_version
+from recipes.changes import (KEPT_CHANGES, get_recipe_changes,
+                             get_recipe_changes_number)
+from recipes.models import Ingredient, IngredientRecipe
+from recipes.utils import get_words
+
+MAX_REPLAYED_CHANGES = KEPT_CHANGES
+
+
+def find_prefix(keys, prefix):
+    """Возвращает границы строк с префиксом в отсортированном списке."""
+
+    start = bisect_left(keys, prefix)
+    return start, bisect_left(keys, prefix + "\uffff", lo=start)
+
+
+class IngredientIndex:
+    """Индекс ингредиентов в памяти процесса для автодополнения.
+
+    Хранит отсортированные поисковые названия, отсортированные пары
+    (слово названия, позиция) и уже сериализованные строки ответа.
+    Поиск по префиксу названия и по началам слов выполняется бинарным
+    поиском и дополняет выдачу так же, как IngredientFilter.
+    Индекс перестраивается при смене версии справочника ингредиентов."""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.snapshot = None
+        self.version = None
+
+    def build(self):
+        ingredients = list(Ingredient.objects.all())
+        rows = IngredientSerializer(ingredients, many=True).data
+        words = [get_words(ingredient.search_name)
+                 for ingredient in ingredients]
+        entries = sorted(
+            (ingredient.search_name, position)
+            for position, ingredient in enumerate(ingredients))
+        word_entries = sorted(
+            (word, position) for position, name_words in enumerate(words)
+            for word in set(name_words))
+        return ([name for name, _ in entries],
+                [position for _, position in entries],
+                [word for word, _ in word_entries],
+                [position for _, position in word_entries],
+                [ingredient.search_name for ingredient in ingredients],
+                words, rows)
+
+    def get_snapshot(self, version=None):
+        """Возвращает данные индекса, перестраивая его при смене версии.
+
+        Версию, уже прочитанную вызывающим кодом, можно передать, чтобы
+        не читать ее повторно."""
+
+        if version is None:
+            version = get_catalog_version("ingredients")
+        if self.version != version:
+            with self.lock:
+                if self.version != version:
+                    self.snapshot = self.build()
+                    self.version = version
+        return self.snapshot
+
+    def search(self, name, limit, version=None):
+        """Возвращает строки ингредиентов в порядке IngredientFilter.
+
+        Для поиска по словам берется слово запроса с самым узким
+        диапазоном в отсортированных словах, остальные слова
+        проверяются только у попавших в него ингредиентов."""
+
+        (names, positions, word_keys, word_positions, search_names, words,
+         rows) = self.get_snapshot(version)
+        if not name:
+            return list(rows)
+        start, end = find_prefix(names, name)
+        found = nsmallest(limit, positions[start:end])
+        query = get_words(name)
+        if len(found) < limit and query:
+            start, end = min(
+                (find_prefix(word_keys, prefix) for prefix in query),
+                key=lambda bounds: bounds[1] - bounds[0])
+            found += nsmallest(limit - len(found), {
+                position for position in word_positions[start:end]
+                if not search_names[position].startswith(name) and all(
+                    any(word.startswith(prefix) for word in words[position])
+                    for prefix in query)})
+        return [rows[position] for position in found]
+
+
+ingredient_index = IngredientIndex()
+
+
+class PantryIndex:
+    """Обратный индекс ингредиентов для подбора рецептов по продуктам.
+
+    Для каждого ингредиента хранит отсортированный массив id рецептов,
+    для каждого рецепта - кортеж его ингредиентов. Изменения рецептов
+    дочитываются из журнала в базе, общего для всех процессов, и
+    применяются только к затронутым рецептам. Если индекс отстал больше,
+    чем на MAX_REPLAYED_CHANGES записей, он строится заново."""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.postings = None
+        self.ingredients = None
+        self.number = None
+
+    def build(self):
+        postings, ingredients = defaultdict(list), defaultdict(list)
+        for recipe_id, ingredient_id in IngredientRecipe.objects.values_list(
+                "recipe_id", "ingredient_id").iterator(chunk_size=10000):
+            postings[ingredient_id].append(recipe_id)
+            ingredients[recipe_id].append(ingredient_id)
+        self.postings = {
+            ingredient_id: array("q", sorted(recipe_ids))
+            for ingredient_id, recipe_ids in postings.items()}
+        self.ingredients = {
+            recipe_id: tuple(ingredient_ids)
+            for recipe_id, ingredient_ids in ingredients.items()}
+
+    def update(self, recipe_ids):
+        """Перечитывает ингредиенты рецептов, удаленные убирает."""
+
+        ingredients = defaultdict(list)
+        for recipe_id, ingredient_id in IngredientRecipe.objects.filter(
+                recipe_id__in=recipe_ids).values_list(
+                "recipe_id", "ingredient_id"):
+            ingredients[recipe_id].append(ingredient_id)
+        for recipe_id in recipe_ids:
+            for ingredient_id in self.ingredients.pop(recipe_id, ()):
+                posting = self.postings[ingredient_id]
+                del posting[bisect_left(posting, recipe_id)]
+            for ingredient_id in ingredients.get(recipe_id, ()):
+                insort(self.postings.setdefault(
+                    ingredient_id, array("q")), recipe_id)
+            if recipe_id in ingredients:
+                self.ingredients[recipe_id] = tuple(ingredients[recipe_id])
+
+    def sync(self):
+        """Догоняет журнал изменений рецептов. Вызывается под lock."""
+
+        number = get_recipe_changes_number()
+        if number == self.number:
+            return
+        changes = None
+        if (self.number is not None
+                and 0 < number - self.number <= MAX_REPLAYED_CHANGES):
+            changes = get_recipe_changes(self.number, number)
+        if changes is None:
+            self.build()
+        else:
+            self.update(changes)
+        self.number = number
+
+    def search(self, ingredients, limit, max_missing=None):
+        """Возвращает лучшие рецепты из имеющихся ингредиентов.
+
+        Число совпадений рецепта - размер пересечения его ингредиентов
+        с запросом, его считают проходом по спискам рецептов этих
+        ингредиентов. Рецепты упорядочены по доле имеющихся
+        ингредиентов, затем по числу совпадений и новизне, лучшие
+        limit выбираются кучей. Возвращает кортежи
+        (id рецепта, совпало, не хватает)."""
+
+        with self.lock:
+            self.sync()
+            matched = Counter()
+            for ingredient_id in set(ingredients):
+                matched.update(self.postings.get(ingredient_id, ()))
+            candidates = []
+            for recipe_id, count in matched.items():
+                missing = len(self.ingredients[recipe_id]) - count
+                if max_missing is None or missing <= max_missing:
+                    candidates.append(
+                        (count / (count + missing), count, recipe_id,
+                         missing))
+        return [(recipe_id, count, missing) for _, count, recipe_id, missing
+                in nlargest(limit, candidates)]
+
+
+pantry_index = PantryIndex()
@@ -1,12 +1,20 @@
+from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.db import transaction
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from drf_extra_fields.fields import Base64ImageField
-from rest_framework.serializers import (CharField,
-                                        IntegerField, ModelSerializer,
-                                        ReadOnlyField, SerializerMethodField)
-
+from rest_framework.serializers import (CharField, ImageField,
+                                        IntegerField, ListField,
+                                        ModelSerializer, ReadOnlyField,
+                                        Serializer, SerializerMethodField)
+
+from api.fields import RecipeImageField
+from recipes import shopping_list, timeline
+from recipes.changes import log_recipe_changes
+from recipes.images import schedule_variants
 from recipes.models import (Favorite, Ingredient, IngredientRecipe,
                             Recipe, ShoppingCart, Tag)
+from recipes.search import update_search_vectors
 from users.models import Follow, User
 
 
@@ -21,10 +29,13 @@ class CustomUserSerializer(UserSerializer):
                   "last_name", "email", "is_subscribed", )
 
     def get_is_subscribed(self, obj):
-        return (
-            self.context["request"].user.is_authenticated
-            and Follow.objects.filter(
-                user=self.context["request"].user, author=obj).exists())
+        user = self.context["request"].user
+        if not user.is_authenticated:
+            return False
+        subscriptions = self.context.get("subscriptions")
+        if subscriptions is not None:
+            return obj.id in subscriptions
+        return Follow.objects.filter(user=user, author=obj).exists()
 
 
 class CreateUserSerializer(UserCreateSerializer):
@@ -77,7 +88,9 @@ class RecipeSerializer(ModelSerializer):
         many=True,
         read_only=True,
         source="ingredientrecipe")
-    image = Base64ImageField(required=True)
+    image = RecipeImageField(required=True)
+    thumbnail = ImageField(read_only=True)
+    image_webp = ImageField(read_only=True)
     cooking_time = IntegerField(required=True)
     is_favorited = SerializerMethodField()
     is_in_shopping_cart = SerializerMethodField()
@@ -86,9 +99,11 @@ class RecipeSerializer(ModelSerializer):
         model = Recipe
         fields = ("id", "name", "tags", "ingredients", "author",
                   "is_favorited", "is_in_shopping_cart", "image",
-                  "text", "cooking_time", )
+                  "thumbnail", "image_webp", "text", "cooking_time", )
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, "is_favorited"):
+            return obj.is_favorited
         user = self.context.get("request").user
         if user.is_anonymous:
             return False
@@ -96,6 +111,8 @@ class RecipeSerializer(ModelSerializer):
             user=user, recipe=obj).exists()
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, "is_in_shopping_cart"):
+            return obj.is_in_shopping_cart
         user = self.context.get("request").user
         if user.is_anonymous:
             return False
@@ -176,6 +193,7 @@ class RecipeSerializer(ModelSerializer):
         data = self.validate_ingredients(data)
         return data
 
+    @transaction.atomic
     def create(self, validated_data):
         """Функция для создания рецепта."""
 
@@ -184,16 +202,32 @@ class RecipeSerializer(ModelSerializer):
         recipe = Recipe.objects.create(**validated_data)
         recipe.tags.set(tags)
         self.create_ingredients(ingredients, recipe)
+        update_search_vectors(Recipe.objects.filter(pk=recipe.pk))
+        timeline.push([recipe])
+        schedule_variants(recipe)
+        log_recipe_changes([recipe.pk])
         return recipe
 
+    @transaction.atomic
     def update(self, recipe, validated_data):
         """Функция для обновления рецепта."""
 
         recipe.tags.set(self.initial_data.get("tags"))
+        user_ids = list(recipe.shoppingcart.values_list("user_id", flat=True))
+        shopping_list.remove_recipe(recipe, user_ids)
         IngredientRecipe.objects.filter(recipe=recipe).all().delete()
         ingredients = validated_data.pop("ingredients")
         self.create_ingredients(ingredients, recipe)
-        return super().update(recipe, validated_data)
+        shopping_list.add_recipe(recipe, user_ids)
+        recipe = super().update(recipe, validated_data)
+        update_search_vectors(Recipe.objects.filter(pk=recipe.pk))
+        if "image" in validated_data:
+            schedule_variants(recipe)
+        log_recipe_changes([recipe.pk])
+        return recipe
+
+
+RECIPE_SHORT_FIELDS = ("id", "name", "image", "thumbnail", "cooking_time")
 
 
 class CustomRecipeSerializer(ModelSerializer):
@@ -201,16 +235,12 @@ class CustomRecipeSerializer(ModelSerializer):
     отображения в подписках и избранном."""
 
     image = Base64ImageField()
+    thumbnail = ImageField(read_only=True)
 
     class Meta:
         model = Recipe
-        fields = (
-            "id",
-            "name",
-            "image",
-            "cooking_time",
-        )
-        read_only_fields = ("id", "name", "image", "cooking_time")
+        fields = RECIPE_SHORT_FIELDS
+        read_only_fields = RECIPE_SHORT_FIELDS
 
 
 class FollowSerializer(ModelSerializer):
@@ -218,24 +248,106 @@ class FollowSerializer(ModelSerializer):
 
     is_subscribed = SerializerMethodField()
     recipes = SerializerMethodField()
-    recipes_count = SerializerMethodField()
+    recipes_count = ReadOnlyField()
 
     class Meta(UserSerializer.Meta):
         fields = ("email", "id", "username", "first_name",
                   "last_name", "recipes", "recipes_count", "is_subscribed",)
 
+    @staticmethod
+    def get_recipes_limit(request):
+        limit = request.GET.get("recipes_limit")
+        if limit and limit.isdigit():
+            return int(limit)
+        return None
+
+    @classmethod
+    def get_latest_recipes(cls, authors, request):
+        """Выбирает последние рецепты всех авторов страницы одним запросом.
+
+        Ограничение recipes_limit применяется к каждому автору через
+        ROW_NUMBER() OVER (PARTITION BY author_id)."""
+
+        author_ids = [author.id for author in authors]
+        limit = cls.get_recipes_limit(request)
+        recipes_by_author = {author_id: [] for author_id in author_ids}
+        if not author_ids:
+            return recipes_by_author
+        if limit is None:
+            recipes = Recipe.objects.filter(author_id__in=author_ids).only(
+                "author", *RECIPE_SHORT_FIELDS)
+        else:
+            placeholders = ", ".join(["%s"] * len(author_ids))
+            columns = ", ".join(("author_id", *RECIPE_SHORT_FIELDS))
+            recipes = Recipe.objects.raw(
+                f"SELECT {columns} FROM (SELECT {columns}, "
+                "ROW_NUMBER() OVER (PARTITION BY author_id ORDER BY id DESC)"
+                f" AS row_number FROM {Recipe._meta.db_table} "
+                f"WHERE author_id IN ({placeholders})) AS recipes "
+                "WHERE row_number <= %s ORDER BY id DESC",
+                [*author_ids, limit])
+        for recipe in recipes:
+            recipes_by_author[recipe.author_id].append(recipe)
+        return recipes_by_author
+
     def get_is_subscribed(self, obj):
-        user = self.context["request"].user
-        return Follow.objects.filter(
-            user=user, author=obj).exists()
+        """Сериализатор отдает только авторов, на которых
+        пользователь подписан."""
+
+        return True
 
     def get_recipes(self, obj):
-        request = self.context.get("request")
-        limit = request.GET.get("recipes_limit")
-        recipes = Recipe.objects.filter(author=obj)
-        if limit and limit.isdigit():
-            recipes = recipes[:int(limit)]
+        recipes_by_author = self.context.get("recipes")
+        if recipes_by_author is not None:
+            recipes = recipes_by_author[obj.id]
+        else:
+            recipes = Recipe.objects.filter(author=obj)
+            limit = self.get_recipes_limit(self.context.get("request"))
+            if limit is not None:
+                recipes = recipes[:limit]
         return CustomRecipeSerializer(recipes, many=True).data
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
+
+class BulkIdsSerializer(Serializer):
+    """Сериализатор списка id для пакетных действий."""
+
+    ids = ListField(
+        child=IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BULK_MAX_IDS)
+
+    def validate_ids(self, value):
+        return list(dict.fromkeys(value))
+
+
+class LimitSerializer(Serializer):
+    """Размер выдачи подборок рецептов."""
+
+    limit = IntegerField(min_value=1, max_value=100, default=6)
+
+
+class FeedSerializer(LimitSerializer):
+    """Параметры страницы ленты: рецепты с id меньше before."""
+
+    before = IntegerField(min_value=1, required=False)
+
+
+class PantrySerializer(LimitSerializer):
+    """Параметры подбора рецептов по имеющимся продуктам."""
+
+    ingredients = ListField(
+        child=IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BULK_MAX_IDS)
+    max_missing = IntegerField(min_value=0, required=False)
+
+
+class PantryRecipeSerializer(RecipeSerializer):
+    """Рецепт с числом имеющихся и недостающих ингредиентов."""
+
+    matched_ingredients = IntegerField(read_only=True)
+    missing_ingredients = IntegerField(read_only=True)
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + (
+            "matched_ingredients", "missing_ingredients")
@@ -0,0 +1,18 @@
+from api.authentication import invalidate_token, invalidate_user
+from recipes.catalog import bump_catalog_version
+
+
+def bump_ingredients_version(sender, **kwargs):
+    bump_catalog_version("ingredients")
+
+
+def bump_tags_version(sender, **kwargs):
+    bump_catalog_version("tags")
+
+
+def invalidate_cached_token(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+def invalidate_cached_user(sender, instance, **kwargs):
+    invalidate_user(instance.id)
@@ -0,0 +1,214 @@
+import json
+from collections import Counter, defaultdict
+from itertools import islice
+
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models import F
+from rest_framework.exceptions import ValidationError
+
+from api.fields import RecipeImageField
+from recipes import timeline
+from recipes.changes import log_recipe_changes
+from recipes.models import (Ingredient, IngredientRecipe, Recipe,
+                            RecipeScore, Tag)
+from recipes.search import update_search_vectors
+from users.models import User
+
+BATCH_SIZE = 500
+NAME_MAX_LENGTH = Recipe._meta.get_field("name").max_length
+SMALL_INTEGER_MAX = 32767
+
+
+def export_recipes(queryset, batch_size=BATCH_SIZE):
+    """Отдает рецепты построчно в формате NDJSON.
+
+    На каждую пачку рецептов приходится три запроса: сами рецепты,
+    их теги и ингредиенты."""
+
+    recipes = queryset.order_by("id").values(
+        "id", "name", "author__username", "text", "cooking_time",
+        "image").iterator(chunk_size=batch_size)
+    while True:
+        batch = list(islice(recipes, batch_size))
+        if not batch:
+            break
+        recipe_ids = [recipe["id"] for recipe in batch]
+        tags = defaultdict(list)
+        for recipe_id, tag_id in Recipe.tags.through.objects.filter(
+                recipe_id__in=recipe_ids).values_list(
+                "recipe_id", "tag_id").order_by("id"):
+            tags[recipe_id].append(tag_id)
+        ingredients = defaultdict(list)
+        amounts = IngredientRecipe.objects.filter(
+            recipe_id__in=recipe_ids).values_list(
+            "recipe_id", "ingredient_id", "amount").order_by("id")
+        for recipe_id, ingredient_id, amount in amounts:
+            ingredients[recipe_id].append(
+                {"id": ingredient_id, "amount": amount})
+        for recipe in batch:
+            yield json.dumps({
+                "id": recipe["id"],
+                "name": recipe["name"],
+                "author": recipe["author__username"],
+                "text": recipe["text"],
+                "cooking_time": recipe["cooking_time"],
+                "image": recipe["image"],
+                "tags": tags[recipe["id"]],
+                "ingredients": ingredients[recipe["id"]],
+            }, ensure_ascii=False) + "\n"
+
+
+def load_catalog():
+    """Загружает множества id тегов и ингредиентов для проверки строк."""
+
+    return {
+        "tags": set(Tag.objects.values_list("id", flat=True)),
+        "ingredients": set(Ingredient.objects.values_list("id", flat=True)),
+    }
+
+
+def read_chunks(lines, size=BATCH_SIZE):
+    """Разбивает строки файла на пачки пар (номер строки, строка)."""
+
+    numbered = (
+        (number, line) for number, line in enumerate(lines, 1)
+        if line.strip())
+    while True:
+        chunk = list(islice(numbered, size))
+        if not chunk:
+            break
+        yield chunk
+
+
+def is_small_positive(value):
+    return (isinstance(value, int) and not isinstance(value, bool)
+            and 1 <= value <= SMALL_INTEGER_MAX)
+
+
+def validate_row(row, catalog):
+    """Проверяет строку импорта, возвращает список ошибок."""
+
+    if not isinstance(row, dict):
+        return ["Строка должна быть JSON-объектом."]
+    errors = []
+    name = row.get("name")
+    if not isinstance(name, str) or not 0 < len(name) <= NAME_MAX_LENGTH:
+        errors.append(
+            f"name: строка длиной от 1 до {NAME_MAX_LENGTH} символов.")
+    if not isinstance(row.get("text"), str) or not row["text"]:
+        errors.append("text: обязательное поле.")
+    if not is_small_positive(row.get("cooking_time")):
+        errors.append("cooking_time: время должно быть не меньше минуты.")
+    if not isinstance(row.get("image"), str) or not row["image"]:
+        errors.append("image: путь к файлу или изображение в base64.")
+    tags = row.get("tags")
+    if not isinstance(tags, list) or not tags:
+        errors.append("tags: нужен хотя бы один тег.")
+    elif not all(isinstance(tag, int) and tag in catalog["tags"]
+                 for tag in tags):
+        errors.append("tags: неизвестный тег.")
+    ingredients = row.get("ingredients")
+    if not isinstance(ingredients, list) or not ingredients:
+        errors.append("ingredients: нужен хотя бы один ингредиент.")
+    elif not all(
+            isinstance(item, dict) and isinstance(item.get("id"), int)
+            and item["id"] in catalog["ingredients"]
+            and is_small_positive(item.get("amount"))
+            for item in ingredients):
+        errors.append("ingredients: неизвестный ингредиент или количество.")
+    elif len({item["id"] for item in ingredients}) != len(ingredients):
+        errors.append("ingredients: ингредиенты не должны повторяться.")
+    return errors
+
+
+def save_image(value):
+    """Сохраняет изображение из data URI, путь к файлу оставляет как есть."""
+
+    if not value.startswith("data:"):
+        return value
+    file = RecipeImageField().to_internal_value(value)
+    return default_storage.save(f"images/{file.name}", file)
+
+
+def create_recipes(recipes, rows):
+    """Создает рецепты с тегами и ингредиентами в одной транзакции."""
+
+    with transaction.atomic():
+        if connection.features.can_return_rows_from_bulk_insert:
+            Recipe.objects.bulk_create(recipes)
+            RecipeScore.objects.bulk_create(
+                RecipeScore(recipe=recipe) for recipe in recipes)
+            for author_id, count in Counter(
+                    recipe.author_id for recipe in recipes).items():
+                User.objects.filter(pk=author_id).update(
+                    recipes_count=F("recipes_count") + count)
+        else:
+            for recipe in recipes:
+                recipe.save()
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe_id=recipe.id, tag_id=tag_id)
+            for recipe, row in zip(recipes, rows)
+            for tag_id in dict.fromkeys(row["tags"]))
+        IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(recipe_id=recipe.id, ingredient_id=item["id"],
+                             amount=item["amount"])
+            for recipe, row in zip(recipes, rows)
+            for item in row["ingredients"])
+        recipe_ids = [recipe.id for recipe in recipes]
+        update_search_vectors(Recipe.objects.filter(id__in=recipe_ids))
+        timeline.push(recipes)
+        log_recipe_changes(recipe_ids)
+
+
+def import_chunk(chunk, catalog, default_author_id=None):
+    """Импортирует пачку строк NDJSON.
+
+    Рецепты, теги и ингредиенты создаются тремя bulk_create в одной
+    транзакции, счетчики рецептов авторов, оценки, поисковые векторы,
+    журнал изменений рецептов и ленты подписчиков обновляются
+    отдельно, так как сигналы при bulk_create не срабатывают.
+    Изображения из base64 сохраняются до транзакции и удаляются,
+    если пачку не удалось сохранить.
+    Возвращает число созданных рецептов и ошибки по номерам строк."""
+
+    rows, errors = [], []
+    for number, line in chunk:
+        try:
+            row = json.loads(line)
+        except ValueError:
+            errors.append((number, ["Некорректный JSON."]))
+            continue
+        row_errors = validate_row(row, catalog)
+        if row_errors:
+            errors.append((number, row_errors))
+        else:
+            rows.append((number, row))
+    usernames = {row["author"] for _, row in rows if row.get("author")}
+    authors = dict(User.objects.filter(
+        username__in=usernames).values_list("username", "id"))
+    recipes, valid, images = [], [], []
+    try:
+        for number, row in rows:
+            author_id = (authors.get(row["author"]) if row.get("author")
+                         else default_author_id)
+            if author_id is None:
+                errors.append((number, ["author: пользователь не найден."]))
+                continue
+            try:
+                image = save_image(row["image"])
+            except ValidationError as error:
+                errors.append((number, [f"image: {error.detail[0]}"]))
+                continue
+            if image != row["image"]:
+                images.append(image)
+            recipes.append(Recipe(
+                name=row["name"], text=row["text"], author_id=author_id,
+                cooking_time=row["cooking_time"], image=image))
+            valid.append(row)
+        create_recipes(recipes, valid)
+    except Exception:
+        for image in images:
+            default_storage.delete(image)
+        raise
+    return len(recipes), sorted(errors)
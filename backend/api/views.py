@@ -1,41 +1,100 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+from itertools import chain
+
+from django.conf import settings
+from django.db.models import Count, Exists, OuterRef, Prefetch, Value
+from django.http import Http404, StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import get_object_or_404
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
-from rest_framework.filters import SearchFilter
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
-from api.filters import IngredientFilter, RecipeFilter
-from api.paginators import PageLimitPagination
-from api.permissions import IsAdminOrReadOnly, IsAuthorOrReadOnly
-from api.serializers import (CustomRecipeSerializer, IngredientSerializer,
+from api import transfer
+from api.filters import (IngredientFilter, RecipeFilter,
+                         RecipeOrderingFilter)
+from api.mixins import BulkToggleMixin, CatalogCacheMixin
+from api.paginators import PageOrCursorPagination
+from api.parsers import NDJSONParser
+from api.permissions import IsAdmin, IsAdminOrReadOnly, IsAuthorOrReadOnly
+from api.renderers import (ShoppingListCSVRenderer, ShoppingListJSONRenderer,
+                           ShoppingListTextRenderer)
+from api.search import ingredient_index, pantry_index
+from api.serializers import (CustomRecipeSerializer, FeedSerializer,
+                             IngredientSerializer, LimitSerializer,
+                             PantryRecipeSerializer, PantrySerializer,
                              RecipeSerializer, TagSerializer)
+from recipes import timeline, toggles
 from recipes.models import (Favorite, Ingredient, IngredientRecipe,
-                            Recipe, ShoppingCart, Tag)
+                            Recipe, ShoppingCart, ShoppingListItem,
+                            SimilarRecipe, Tag)
+from recipes.utils import normalize_name
+from users.models import Follow
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(CatalogCacheMixin, viewsets.ReadOnlyModelViewSet):
     """Вьюсет для ингредиентов."""
 
+    catalog = "ingredients"
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     filter_backends = (DjangoFilterBackend, IngredientFilter,)
-    search_fields = ("^name",)
+
+    def list(self, request, *args, **kwargs):
+        if settings.INGREDIENT_SEARCH_BACKEND == "memory":
+            return self.get_cached_response(request, self.search_in_memory)
+        return super().list(request, *args, **kwargs)
+
+    def search_in_memory(self, request):
+        name = normalize_name(
+            request.query_params.get(IngredientFilter.search_param, ""))
+        return Response(ingredient_index.search(
+            name, IngredientFilter.limit, self.catalog_version))
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(BulkToggleMixin, viewsets.ModelViewSet):
     """Вьюсет для рецептов."""
 
     queryset = Recipe.objects.select_related(
-        "author").prefetch_related("tags")
+        "author").defer("search_vector").prefetch_related(
+        "tags",
+        Prefetch("ingredientrecipe",
+                 queryset=IngredientRecipe.objects.select_related(
+                     "ingredient")))
     serializer_class = RecipeSerializer
     permission_classes = (IsAuthorOrReadOnly,)
-    filter_backends = (DjangoFilterBackend, SearchFilter)
+    filter_backends = (DjangoFilterBackend, RecipeOrderingFilter)
     filterset_class = RecipeFilter
-    pagination_class = PageLimitPagination
+    pagination_class = PageOrCursorPagination
+    lookup_value_regex = r"\d+"
+
+    def get_queryset(self):
+        """Аннотирует рецепты флагами избранного и списка покупок
+        одним запросом на всю страницу."""
+
+        user = self.request.user
+        if user.is_anonymous:
+            return self.queryset.annotate(
+                is_favorited=Value(False),
+                is_in_shopping_cart=Value(False))
+        return self.queryset.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef("pk"))),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef("pk"))))
+
+    def get_serializer_context(self):
+        """Добавляет в контекст id авторов, на которых подписан
+        пользователь, чтобы не проверять подписку для каждого рецепта."""
+
+        context = super().get_serializer_context()
+        user = self.request.user
+        if user.is_authenticated:
+            context["subscriptions"] = set(
+                Follow.objects.filter(user=user).values_list(
+                    "author_id", flat=True))
+        return context
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
@@ -43,68 +102,189 @@ class RecipeViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=["POST", "DELETE"],
             permission_classes=[IsAuthenticated])
     def favorite(self, request, pk):
-        recipe = get_object_or_404(Recipe, pk=pk)
-        user = self.request.user
-        favorite = Favorite.objects.filter(recipe=recipe, user=user)
-        if request.method == "POST" and not favorite.exists():
-            serializer = CustomRecipeSerializer(recipe)
-            Favorite.objects.create(user=request.user, recipe=recipe)
+        user = request.user
+        if request.method == "POST":
+            recipes = toggles.add_favorites(user.id, [pk])
+            if not recipes:
+                get_object_or_404(Recipe, pk=pk)
+                return Response({"errors": "Рецепт уже в избранном!"},
+                                status=status.HTTP_400_BAD_REQUEST)
+            serializer = CustomRecipeSerializer(recipes[0])
             return Response(serializer.data, status=status.HTTP_201_CREATED)
-        if request.method == "DELETE":
-            obj_to_delete = get_object_or_404(Favorite, user=request.user,
-                                              recipe=recipe)
-            obj_to_delete.delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
-        return Response({
-            "errors": "Можно использовать только методы Post и Delete"},
-            status=status.HTTP_400_BAD_REQUEST)
+        if not toggles.remove_favorites(user.id, [pk]):
+            raise Http404
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=True, methods=["POST", "DELETE"],
             permission_classes=[IsAuthenticated])
     def shopping_cart(self, request, pk):
-        recipe = get_object_or_404(Recipe, pk=pk)
-        user = self.request.user
-        shopping_cart = user.shoppingcart.filter(recipe=recipe)
-        if request.method == "POST" and not shopping_cart.exists():
-            serializer = CustomRecipeSerializer(recipe)
-            ShoppingCart.objects.create(user=request.user, recipe=recipe)
+        user = request.user
+        if request.method == "POST":
+            recipes = toggles.add_to_shopping_cart(user.id, [pk])
+            if not recipes:
+                get_object_or_404(Recipe, pk=pk)
+                return Response({"errors": "Рецепт уже в списке покупок!"},
+                                status=status.HTTP_400_BAD_REQUEST)
+            serializer = CustomRecipeSerializer(recipes[0])
             return Response(serializer.data, status=status.HTTP_201_CREATED)
-        if request.method == "DELETE":
-            obj_to_delete = get_object_or_404(ShoppingCart, user=request.user,
-                                              recipe=recipe)
-            obj_to_delete.delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
-        return Response({
-            "errors": "Можно использовать только методы Post и Delete"},
-            status=status.HTTP_400_BAD_REQUEST)
+        if not toggles.remove_from_shopping_cart(user.id, [pk]):
+            raise Http404
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=False, methods=["POST", "DELETE"],
+            permission_classes=[IsAuthenticated],
+            url_path="favorite", url_name="favorite-bulk")
+    def favorite_bulk(self, request):
+        return self.bulk_toggle(
+            request, Recipe.objects.all(),
+            toggles.add_favorites, toggles.remove_favorites)
+
+    @action(detail=False, methods=["POST", "DELETE"],
+            permission_classes=[IsAuthenticated],
+            url_path="shopping_cart", url_name="shopping-cart-bulk")
+    def shopping_cart_bulk(self, request):
+        return self.bulk_toggle(
+            request, Recipe.objects.all(),
+            toggles.add_to_shopping_cart, toggles.remove_from_shopping_cart)
 
     @action(detail=False, methods=["GET"],
-            permission_classes=[IsAuthenticated])
+            permission_classes=[IsAuthenticated],
+            renderer_classes=[ShoppingListTextRenderer,
+                              ShoppingListCSVRenderer,
+                              ShoppingListJSONRenderer])
     def download_shopping_cart(self, request):
-        user = request.user
-        if not user.shoppingcart.exists():
-            return Response(status=status.HTTP_400_BAD_REQUEST)
+        """Отдает список покупок потоком в формате txt, csv или json,
+        выбранном по параметру format или заголовку Accept."""
+
         ingredients = (
-            IngredientRecipe.objects.filter(recipe__shoppingcart__user=user)
+            ShoppingListItem.objects.filter(user=request.user, total__gt=0)
             .values("ingredient__name",
-                    "ingredient__measurement_unit",)
+                    "ingredient__measurement_unit",
+                    "total")
             .order_by("ingredient__name")
-            .annotate(total=Sum("amount")))
-        shopping_list_content = "Список покупок:\n\n"
-        shopping_list_content += '\n'.join([
-            f'{ingredient["ingredient__name"]} - {ingredient["total"]} '
-            f'{ingredient["ingredient__measurement_unit"]}'
-            for ingredient in ingredients])
-        response = HttpResponse(shopping_list_content,
-                                content_type="text/plain")
-        response['Content-Disposition'] = (
-            'attachment; filename="shopping_list.txt"')
+            .iterator(chunk_size=2000))
+        first = next(ingredients, None)
+        if first is None:
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(chain([first], ingredients)),
+            content_type=f"{renderer.media_type}; charset=utf-8")
+        response["Content-Disposition"] = (
+            f'attachment; filename="shopping_list.{renderer.format}"')
         return response
 
+    @action(detail=False, methods=["GET"], permission_classes=[IsAdmin])
+    def export(self, request):
+        recipes = self.filter_queryset(self.get_queryset())
+        return StreamingHttpResponse(
+            transfer.export_recipes(recipes),
+            content_type="application/x-ndjson")
+
+    @action(detail=False, methods=["GET"],
+            permission_classes=[IsAuthenticated])
+    def feed(self, request):
+        """Рецепты авторов, на которых подписан пользователь.
+
+        id рецептов берутся из ленты пользователя, страницы листаются
+        параметром before. Лента обрезается до FEED_SIZE записей при
+        раскладке новых рецептов, а не при чтении."""
+
+        params = FeedSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        before = params.validated_data.get("before")
+        limit = params.validated_data["limit"]
+        recipe_ids = timeline.get_feed(request.user.id, limit, before)
+        recipes = self.get_queryset().in_bulk(recipe_ids)
+        serializer = self.get_serializer(
+            [recipes[recipe_id] for recipe_id in recipe_ids
+             if recipe_id in recipes], many=True)
+        next_url = None
+        if len(recipe_ids) == limit:
+            next_url = replace_query_param(
+                request.build_absolute_uri(), "before", recipe_ids[-1])
+        return Response({"next": next_url, "results": serializer.data})
+
+    @action(detail=True, methods=["GET"])
+    def similar(self, request, pk):
+        """Рецепты, похожие на данный по ингредиентам и тегам.
+
+        Соседи заранее рассчитываются командой similar_recipes. Для
+        рецептов, добавленных после расчета, выдаются рецепты с
+        наибольшим числом общих ингредиентов."""
+
+        params = LimitSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        limit = params.validated_data["limit"]
+        recipe_ids = list(SimilarRecipe.objects.filter(
+            recipe_id=pk).order_by("-score").values_list(
+            "similar_id", flat=True)[:limit])
+        if not recipe_ids:
+            recipe_ids = list(IngredientRecipe.objects.filter(
+                ingredient__in=IngredientRecipe.objects.filter(
+                    recipe_id=pk).values("ingredient_id")).exclude(
+                recipe_id=pk).values("recipe_id").annotate(
+                common=Count("id")).order_by(
+                "-common", "-recipe_id").values_list(
+                "recipe_id", flat=True)[:limit])
+        if not recipe_ids:
+            get_object_or_404(Recipe, pk=pk)
+        recipes = self.get_queryset().in_bulk(recipe_ids)
+        serializer = self.get_serializer(
+            [recipes[recipe_id] for recipe_id in recipe_ids
+             if recipe_id in recipes], many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=["GET"])
+    def pantry(self, request):
+        """Рецепты, которые можно приготовить из имеющихся ингредиентов.
+
+        Кандидаты и порядок берутся из обратного индекса в памяти,
+        из базы загружается только итоговая выдача."""
+
+        params = PantrySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        found = pantry_index.search(**params.validated_data)
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for recipe_id, _, _ in found])
+        results = []
+        for recipe_id, matched, missing in found:
+            recipe = recipes.get(recipe_id)
+            if recipe is not None:
+                recipe.matched_ingredients = matched
+                recipe.missing_ingredients = missing
+                results.append(recipe)
+        serializer = PantryRecipeSerializer(
+            results, many=True, context=self.get_serializer_context())
+        return Response(serializer.data)
+
+    @action(detail=False, methods=["POST"], permission_classes=[IsAdmin],
+            parser_classes=[NDJSONParser], url_path="import",
+            url_name="import")
+    def import_recipes(self, request):
+        """Импорт рецептов из тела запроса в формате NDJSON.
+
+        Строки без author создаются от имени администратора."""
+
+        catalog = transfer.load_catalog()
+        created, errors = 0, []
+        for chunk in transfer.read_chunks(request.data):
+            chunk_created, chunk_errors = transfer.import_chunk(
+                chunk, catalog, request.user.id)
+            created += chunk_created
+            errors += chunk_errors
+        return Response({
+            "created": created,
+            "errors": [{"line": number, "errors": messages}
+                       for number, messages in errors]},
+            status=(status.HTTP_201_CREATED if created
+                    else status.HTTP_400_BAD_REQUEST))
+
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(CatalogCacheMixin, viewsets.ReadOnlyModelViewSet):
     """Вьюсет для тегов."""
 
+    catalog = "tags"
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (IsAdminOrReadOnly, )
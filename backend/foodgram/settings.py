@@ -30,6 +30,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'djoser',
@@ -85,6 +86,27 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+
+CACHE_BACKEND = os.getenv(
+    'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache')
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Кеш общий для всех процессов, если это не locmem и не dummy. Данные,
+# которые должны сразу сбрасываться во всех процессах, кешируются
+# только в общем кеше.
+SHARED_CACHE = CACHE_BACKEND not in (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -128,6 +150,17 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Миниатюры и WebP варианты изображений рецептов создаются в фоновом
+# пуле потоков; при IMAGE_WORKERS=0 - сразу после сохранения рецепта.
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', 2))
+RECIPE_THUMBNAIL_SIZE = (480, 480)
+RECIPE_IMAGE_WEBP_SIZE = (1600, 1600)
+
+# Ограничения на загружаемые изображения рецептов: размер файла
+# после декодирования base64 и количество пикселей.
+RECIPE_IMAGE_MAX_SIZE = 10 * 1024 * 1024
+RECIPE_IMAGE_MAX_PIXELS = 24_000_000
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -135,15 +168,41 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'users.User'
 
+# Поиск ингредиентов: "db" - запросами к базе, "memory" - по индексу
+# в памяти каждого процесса.
+INGREDIENT_SEARCH_BACKEND = os.getenv('INGREDIENT_SEARCH_BACKEND', 'db')
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication' if SHARED_CACHE
+        else 'rest_framework.authentication.TokenAuthentication',
     ]
 }
 
+# Время жизни закешированной пары пользователь-токен в секундах. Токены
+# кешируются только в общем кеше: иначе выход и смена пароля не сбросили
+# бы токен в остальных процессах.
+AUTH_TOKEN_CACHE_TIMEOUT = 60
+
+# Время жизни версии справочника в общем кеше в секундах. Сигналы сразу
+# записывают в кеш новую версию, срок ограничивает расхождение, если
+# запись не дошла.
+CATALOG_VERSION_CACHE_TIMEOUT = 60 * 60
+
+# Наибольшее число id в одном пакетном запросе к избранному, корзине
+# и подпискам.
+BULK_MAX_IDS = 100
+
+# Сколько последних рецептов хранится в ленте подписок пользователя.
+FEED_SIZE = 500
+
+# Рецепты авторов с большим числом подписчиков не раскладываются по лентам
+# при публикации, а читаются из их рецептов при запросе ленты.
+FEED_FANOUT_MAX_FOLLOWERS = 10000
+
 DJOSER = {
     'LOGIN_FIELD': 'email',
     'HIDE_USERS': False,
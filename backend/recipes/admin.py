@@ -1,8 +1,11 @@
 from django.contrib import admin
 from django.utils.html import format_html
 
-from recipes.models import (Favorite, Ingredient, IngredientRecipe,
-                            Recipe, ShoppingCart, Tag)
+from recipes import shopping_list, timeline
+from recipes.changes import log_recipe_changes
+from recipes.models import (Ingredient, IngredientRecipe, Recipe,
+                            ShoppingCart, Tag)
+from recipes.search import update_search_vectors
 
 
 class IngredientRecipeInline(admin.TabularInline):
@@ -48,14 +51,41 @@ class RecipeAdmin(admin.ModelAdmin):
     list_filter = ("name", "author", "tags")
     inlines = [IngredientRecipeInline]
 
-    @admin.display(description="Счетчик добавлений в избранное")
+    @admin.display(description="Счетчик добавлений в избранное",
+                   ordering="favorites_count")
     def add_to_favorite(self, obj):
-        return Favorite.objects.filter(recipe=obj).count()
+        return obj.favorites_count
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        update_search_vectors(Recipe.objects.filter(pk=form.instance.pk))
+        if change:
+            shopping_list.rebuild(list(form.instance.shoppingcart.values_list(
+                "user_id", flat=True)))
+        else:
+            timeline.push([form.instance])
+        log_recipe_changes([form.instance.pk])
 
 
 @admin.register(ShoppingCart)
 class ShoppingCartAdmin(admin.ModelAdmin):
-    """Список покупок в панели администратора."""
+    """Список покупок в панели администратора.
+
+    После изменения корзины списки покупок затронутых пользователей
+    пересобираются."""
 
-    list_display = ("user", "recipe")
+    list_display = ("user", "recipe", "created")
     list_filter = ("user",)
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        shopping_list.rebuild({obj.user_id, form.initial.get("user")} - {None})
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        shopping_list.rebuild([obj.user_id])
+
+    def delete_queryset(self, request, queryset):
+        user_ids = set(queryset.values_list("user_id", flat=True))
+        super().delete_queryset(request, queryset)
+        shopping_list.rebuild(user_ids)
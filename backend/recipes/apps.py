@@ -1,6 +1,27 @@
 from django.apps import AppConfig
+from django.db.models.signals import (post_delete, post_migrate, post_save,
+                                      pre_delete)
 
 
 class RecipesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipes'
+
+    def ready(self):
+        from recipes import signals
+        from recipes.models import Favorite, Ingredient, Recipe
+
+        post_migrate.connect(signals.fill_search_names, sender=self)
+        post_migrate.connect(signals.fill_search_vectors, sender=self)
+        post_migrate.connect(signals.fill_recipe_scores, sender=self)
+        post_save.connect(
+            signals.update_ingredient_search_vectors, sender=Ingredient)
+        post_save.connect(signals.increment_favorites_count, sender=Favorite)
+        post_delete.connect(
+            signals.decrement_favorites_count, sender=Favorite)
+        post_save.connect(signals.increment_recipes_count, sender=Recipe)
+        post_save.connect(signals.create_recipe_score, sender=Recipe)
+        post_delete.connect(signals.decrement_recipes_count, sender=Recipe)
+        pre_delete.connect(
+            signals.remove_from_shopping_lists, sender=Recipe)
+        post_delete.connect(signals.log_deleted_recipe, sender=Recipe)
@@ -0,0 +1,57 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from recipes.models import CatalogVersion
+
+
+def get_catalog_version_cache_key(catalog):
+    return f"catalog:{catalog}:version"
+
+
+def read_catalog_version(catalog):
+    """Читает версию справочника из базы, 0 - если он еще не менялся."""
+
+    version = CatalogVersion.objects.filter(
+        catalog=catalog).values_list("version", flat=True).first()
+    return 0.0 if version is None else version
+
+
+def get_catalog_version(catalog):
+    """Возвращает версию справочника - время его последнего изменения.
+
+    Версия хранится в базе, а при общем кеше (SHARED_CACHE) еще и в нем,
+    так что запрос к базе нужен только при промахе кеша. С кешем
+    процесса версия читается из базы, иначе ее смена не дошла бы до
+    остальных процессов."""
+
+    if not settings.SHARED_CACHE:
+        return read_catalog_version(catalog)
+    key = get_catalog_version_cache_key(catalog)
+    version = cache.get(key)
+    if version is None:
+        version = read_catalog_version(catalog)
+        cache.add(key, version, settings.CATALOG_VERSION_CACHE_TIMEOUT)
+    return version
+
+
+def bump_catalog_version(catalog):
+    """Обновляет версию справочника, делая недействительным его кеш.
+
+    Версия растет хотя бы на секунду, чтобы Last-Modified менялся и
+    при расхождении часов между процессами. После коммита новая
+    версия записывается в общий кеш."""
+
+    if not CatalogVersion.objects.filter(catalog=catalog).update(
+            version=Greatest(F("version") + 1, time.time())):
+        CatalogVersion.objects.get_or_create(
+            catalog=catalog, defaults={"version": time.time()})
+    if settings.SHARED_CACHE:
+        transaction.on_commit(lambda: cache.set(
+            get_catalog_version_cache_key(catalog),
+            read_catalog_version(catalog),
+            settings.CATALOG_VERSION_CACHE_TIMEOUT))
@@ -0,0 +1,48 @@
+from django.db import connection, transaction
+from django.db.models import Max
+
+from recipes.models import RecipeChange
+
+KEPT_CHANGES = 10000
+LOCK_SQL = "SELECT pg_advisory_xact_lock(hashtext(%s))"
+
+
+def log_recipe_changes(recipe_ids):
+    """Записывает id измененных рецептов в журнал в базе.
+
+    Запись идет в транзакции изменения рецепта и видна вместе с ним.
+    Перед ней берется рекомендательная блокировка до конца транзакции,
+    поэтому номера записей становятся видны по возрастанию, и индекс,
+    прочитавший журнал до какого-то номера, не пропустит записи до
+    него. Чтобы изменения рецептов не шли по одному, функция
+    вызывается последней перед коммитом. Записи старше KEPT_CHANGES
+    номеров удаляются."""
+
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return
+    with transaction.atomic():
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(LOCK_SQL, [RecipeChange._meta.db_table])
+        RecipeChange.objects.bulk_create(
+            RecipeChange(recipe=recipe_id) for recipe_id in recipe_ids)
+        RecipeChange.objects.filter(
+            id__lte=get_recipe_changes_number() - KEPT_CHANGES).delete()
+
+
+def get_recipe_changes_number():
+    """Возвращает номер последней записи журнала изменений рецептов."""
+
+    return RecipeChange.objects.aggregate(number=Max("id"))["number"] or 0
+
+
+def get_recipe_changes(since, until):
+    """Возвращает id рецептов из записей журнала с since + 1 по until.
+
+    Если часть записей уже удалена из журнала, возвращает None."""
+
+    if until - since > KEPT_CHANGES:
+        return None
+    return set(RecipeChange.objects.filter(
+        id__gt=since, id__lte=until).values_list("recipe", flat=True))
@@ -0,0 +1,71 @@
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha256
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+from recipes.models import Recipe
+
+executor = ThreadPoolExecutor(
+    max_workers=max(settings.IMAGE_WORKERS, 1),
+    thread_name_prefix="recipe-images")
+
+
+def save_variant(image, name, format, **options):
+    """Сохраняет вариант изображения, если файла с таким именем еще нет."""
+
+    if not default_storage.exists(name):
+        buffer = BytesIO()
+        image.save(buffer, format, **options)
+        name = default_storage.save(name, ContentFile(buffer.getvalue()))
+    return name
+
+
+def make_variants(recipe_id, image_name):
+    """Создает миниатюру и WebP вариант изображения рецепта.
+
+    Имена файлов строятся по хешу содержимого, поэтому одинаковые
+    изображения обрабатываются и хранятся один раз."""
+
+    with default_storage.open(image_name, "rb") as file:
+        content = file.read()
+    digest = sha256(content).hexdigest()[:32]
+    image = ImageOps.exif_transpose(Image.open(BytesIO(content)))
+    image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+    webp = image.copy()
+    webp.thumbnail(settings.RECIPE_IMAGE_WEBP_SIZE)
+    thumbnail = image.convert("RGB")
+    thumbnail.thumbnail(settings.RECIPE_THUMBNAIL_SIZE)
+    Recipe.objects.filter(pk=recipe_id, image=image_name).update(
+        thumbnail=save_variant(
+            thumbnail, f"images/thumbnails/{digest}.jpg", "JPEG",
+            quality=85, optimize=True),
+        image_webp=save_variant(
+            webp, f"images/webp/{digest}.webp", "WEBP", quality=80))
+
+
+def make_variants_in_worker(recipe_id, image_name):
+    """Обрабатывает изображение в потоке пула и закрывает его соединение
+    с БД, чтобы оно не оставалось открытым после задачи."""
+
+    try:
+        make_variants(recipe_id, image_name)
+    finally:
+        close_old_connections()
+
+
+def schedule_variants(recipe):
+    """Ставит обработку изображения рецепта в пул после коммита."""
+
+    def submit():
+        if settings.IMAGE_WORKERS:
+            executor.submit(
+                make_variants_in_worker, recipe.id, recipe.image.name)
+        else:
+            make_variants(recipe.id, recipe.image.name)
+
+    transaction.on_commit(submit)
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes import shopping_list
+
+
+class Command(BaseCommand):
+    """Проверка списков покупок на расхождение с корзинами."""
+
+    help = "Сравнивает списки покупок с суммой ингредиентов в корзинах."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, nargs="+", dest="user_ids")
+        parser.add_argument(
+            "--fix", action="store_true",
+            help="Пересобрать списки пользователей с расхождениями.")
+
+    def handle(self, *args, **options):
+        user_ids = set()
+        for expected, actual in shopping_list.find_mismatches(
+                options["user_ids"]):
+            user_ids.add((expected or actual)[0])
+            self.stdout.write(f"Ожидалось {expected}, сохранено {actual}")
+        if not user_ids:
+            self.stdout.write(self.style.SUCCESS("Расхождений нет."))
+            return
+        if not options["fix"]:
+            raise CommandError(
+                f"Расхождения у пользователей: {len(user_ids)}.")
+        shopping_list.rebuild(user_ids)
+        self.stdout.write(self.style.SUCCESS(
+            f"Пересобраны списки пользователей: {len(user_ids)}."))
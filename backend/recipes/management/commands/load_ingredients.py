@@ -0,0 +1,145 @@
+import csv
+import io
+import json
+import time
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from recipes.catalog import bump_catalog_version
+from recipes.models import Ingredient
+from recipes.utils import normalize_name
+
+CHUNK_SIZE = 64 * 1024
+
+
+def read_csv(file):
+    """Построчно читает CSV файл вида «название,единица измерения»."""
+
+    for row in csv.reader(file):
+        if len(row) >= 2:
+            yield row[0], row[1]
+
+
+def read_json(file):
+    """Потоково читает JSON массив объектов, не загружая файл целиком."""
+
+    decoder = json.JSONDecoder()
+    buffer = ""
+    eof = False
+    while True:
+        buffer = buffer.lstrip(" \t\r\n[,")
+        if buffer.startswith("]") or (eof and not buffer):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if eof:
+                raise CommandError("Некорректный JSON файл.")
+            chunk = file.read(CHUNK_SIZE)
+            eof = not chunk
+            buffer += chunk
+            continue
+        buffer = buffer[end:]
+        yield item.get("name", ""), item.get("measurement_unit", "")
+
+
+class RowStream(io.TextIOBase):
+    """Файлоподобный объект, отдающий строки в формате CSV для COPY."""
+
+    def __init__(self, rows):
+        self.rows = iter(rows)
+        self.buffer = ""
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        while self.rows is not None and (size < 0 or len(self.buffer) < size):
+            batch = list(islice(self.rows, 1000))
+            if not batch:
+                self.rows = None
+                break
+            output = io.StringIO()
+            csv.writer(output).writerows(batch)
+            self.buffer += output.getvalue()
+        if size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+
+class Command(BaseCommand):
+    """Загрузка ингредиентов из CSV или JSON файла.
+
+    В PostgreSQL строки загружаются через COPY во временную таблицу
+    и переносятся в таблицу ингредиентов без дубликатов, в остальных
+    базах используется bulk_create. Повторный запуск не создает дублей."""
+
+    help = "Загружает ингредиенты из CSV или JSON файла."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", type=Path)
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        readers = {".csv": read_csv, ".json": read_json}
+        if path.suffix not in readers:
+            raise CommandError("Поддерживаются только файлы CSV и JSON.")
+        start = time.monotonic()
+        self.processed = 0
+        with open(path, encoding="utf-8") as file, transaction.atomic():
+            rows = self.clean(readers[path.suffix](file))
+            if connection.vendor == "postgresql":
+                created = self.copy(rows)
+            else:
+                created = self.bulk_create(rows, options["batch_size"])
+        bump_catalog_version("ingredients")
+        elapsed = time.monotonic() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Обработано строк: {self.processed}, добавлено: {created}, "
+            f"{self.processed / max(elapsed, 1e-6):.0f} строк/с."))
+
+    def clean(self, rows):
+        """Отбрасывает пустые строки и считает обработанные."""
+
+        for name, measurement_unit in rows:
+            self.processed += 1
+            name, measurement_unit = name.strip(), measurement_unit.strip()
+            if name and measurement_unit:
+                yield name, measurement_unit, normalize_name(name)
+
+    def copy(self, rows):
+        table = Ingredient._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TEMPORARY TABLE ingredient_load "
+                "(name varchar(200), measurement_unit varchar(200), "
+                "search_name varchar(200)) ON COMMIT DROP")
+            cursor.copy_expert(
+                "COPY ingredient_load (name, measurement_unit, search_name) "
+                "FROM STDIN WITH (FORMAT csv)", RowStream(rows))
+            cursor.execute(
+                f"INSERT INTO {table} (name, measurement_unit, search_name) "
+                "SELECT DISTINCT name, measurement_unit, search_name "
+                "FROM ingredient_load "
+                "ON CONFLICT (name, measurement_unit) DO NOTHING")
+            created = cursor.rowcount
+            cursor.execute("DROP TABLE ingredient_load")
+            return created
+
+    def bulk_create(self, rows, batch_size):
+        count = Ingredient.objects.count()
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            Ingredient.objects.bulk_create(
+                (Ingredient(name=name, measurement_unit=measurement_unit,
+                            search_name=search_name)
+                 for name, measurement_unit, search_name in batch),
+                ignore_conflicts=True)
+        return Ingredient.objects.count() - count
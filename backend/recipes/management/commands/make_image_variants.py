@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import make_variants
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    """Создание миниатюр и WebP вариантов для уже загруженных рецептов."""
+
+    help = "Создает варианты изображений для рецептов, у которых их нет."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all", action="store_true",
+            help="Обработать изображения всех рецептов.")
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image="")
+        if not options["all"]:
+            recipes = recipes.filter(thumbnail="")
+        count = 0
+        for recipe_id, image_name in recipes.values_list(
+                "id", "image").iterator():
+            make_variants(recipe_id, image_name)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(
+            f"Обработано рецептов: {count}."))
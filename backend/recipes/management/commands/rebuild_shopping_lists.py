@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from recipes import shopping_list
+
+
+class Command(BaseCommand):
+    """Пересборка списков покупок по рецептам в корзинах."""
+
+    help = "Пересобирает списки покупок всех или указанных пользователей."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, nargs="+", dest="user_ids")
+
+    def handle(self, *args, **options):
+        shopping_list.rebuild(options["user_ids"])
+        self.stdout.write(self.style.SUCCESS("Списки покупок пересобраны."))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from recipes import timeline
+
+
+class Command(BaseCommand):
+    """Пересборка лент подписок по подпискам и рецептам авторов."""
+
+    help = "Пересобирает ленты подписок всех или указанных пользователей."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, nargs="+", dest="user_ids")
+
+    def handle(self, *args, **options):
+        timeline.rebuild(options["user_ids"])
+        self.stdout.write(self.style.SUCCESS("Ленты подписок пересобраны."))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Favorite, Recipe
+from users.models import Follow, User
+
+
+def count(queryset, field):
+    """Подзапрос с количеством связанных записей для каждой строки."""
+
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef("pk")})
+        .order_by().values(field)
+        .annotate(count=Count("pk")).values("count")), 0)
+
+
+class Command(BaseCommand):
+    """Пересчет счетчиков избранного, рецептов и подписчиков."""
+
+    help = "Пересчитывает счетчики рецептов и пользователей."
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        Recipe.objects.update(
+            favorites_count=count(Favorite.objects.all(), "recipe"))
+        User.objects.update(
+            recipes_count=count(Recipe.objects.all(), "author"),
+            followers_count=count(Follow.objects.all(), "author"))
+        self.stdout.write(self.style.SUCCESS("Счетчики пересчитаны."))
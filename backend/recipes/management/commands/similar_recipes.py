@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from recipes.similarity import BATCH_SIZE, NEIGHBOURS, save_neighbours
+
+
+class Command(BaseCommand):
+    """Расчет похожих рецептов по ингредиентам и тегам (TF-IDF, косинус)."""
+
+    help = "Пересчитывает таблицу похожих рецептов."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--count", type=int, default=NEIGHBOURS,
+            help="Сколько похожих рецептов хранить для каждого рецепта.")
+        parser.add_argument(
+            "--batch-size", type=int, default=BATCH_SIZE,
+            help="Сколько строк матрицы перемножать за раз.")
+
+    def handle(self, *args, **options):
+        saved = save_neighbours(options["count"], options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Сохранено пар похожих рецептов: {saved}."))
@@ -0,0 +1,47 @@
+from apscheduler.schedulers.blocking import BlockingScheduler
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from recipes.scores import update_scores
+
+
+class Command(BaseCommand):
+    """Пересчет оценок популярности и трендов рецептов."""
+
+    help = ("Пересчитывает оценки рецептов один раз или по расписанию "
+            "с флагом --schedule.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--schedule", action="store_true",
+            help="Пересчитывать оценки каждые --interval минут.")
+        parser.add_argument("--interval", type=int, default=10)
+
+    def update(self):
+        updated = update_scores()
+        self.stdout.write(self.style.SUCCESS(
+            f"Обновлено оценок рецептов: {updated}."))
+
+    def run_job(self):
+        """Запуск по расписанию: соединение с БД между запусками
+        может закрыться, поэтому старые соединения сбрасываются."""
+
+        close_old_connections()
+        try:
+            self.update()
+        finally:
+            close_old_connections()
+
+    def handle(self, *args, **options):
+        if not options["schedule"]:
+            self.update()
+            return
+        scheduler = BlockingScheduler(timezone=timezone.utc)
+        scheduler.add_job(
+            self.run_job, "interval", minutes=options["interval"],
+            next_run_time=timezone.now(), max_instances=1, coalesce=True)
+        try:
+            scheduler.start()
+        except (KeyboardInterrupt, SystemExit):
+            pass
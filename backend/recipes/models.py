@@ -1,7 +1,11 @@
 from colorfield.fields import ColorField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 
+from recipes.utils import get_name_words, normalize_name
 from users.models import User
 
 
@@ -14,15 +18,36 @@ class Ingredient(models.Model):
     measurement_unit = models.CharField(
         max_length=200,
         verbose_name="Единица измерения")
+    search_name = models.CharField(
+        max_length=200,
+        default="",
+        editable=False,
+        verbose_name="Название для поиска")
 
     class Meta:
         ordering = ["name", ]
         verbose_name = "Ингредиент"
         verbose_name_plural = "Ингредиенты"
+        constraints = [
+            models.UniqueConstraint(
+                fields=("name", "measurement_unit"),
+                name="unique_ingredient"), ]
+        indexes = [
+            models.Index(
+                fields=("search_name",),
+                name="ingredient_search_name_idx",
+                opclasses=("varchar_pattern_ops",)),
+            GinIndex(
+                get_name_words(),
+                name="ingredient_search_words_idx"), ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.search_name = normalize_name(self.name)
+        super().save(*args, **kwargs)
+
 
 class Tag(models.Model):
     """Модель для тегов."""
@@ -49,6 +74,21 @@ class Tag(models.Model):
         return self.name
 
 
+class CatalogVersion(models.Model):
+    """Модель для версии справочника - времени его последнего изменения."""
+
+    catalog = models.CharField(
+        max_length=50,
+        primary_key=True,
+        verbose_name="Справочник",)
+    version = models.FloatField(
+        verbose_name="Версия",)
+
+    class Meta:
+        verbose_name = "Версия справочника"
+        verbose_name_plural = "Версии справочников"
+
+
 class Recipe(models.Model):
     """Модель для рецептов."""
 
@@ -66,21 +106,46 @@ class Recipe(models.Model):
         User,
         verbose_name="Автор",
         related_name="recipes",
-        on_delete=models.CASCADE,)
+        on_delete=models.CASCADE,
+        db_index=False,)
     image = models.ImageField(
         verbose_name="Изображение",
         upload_to="images/",)
+    thumbnail = models.ImageField(
+        verbose_name="Миниатюра",
+        upload_to="images/thumbnails/",
+        blank=True,
+        editable=False,)
+    image_webp = models.ImageField(
+        verbose_name="Изображение WebP",
+        upload_to="images/webp/",
+        blank=True,
+        editable=False,)
     text = models.TextField(
         verbose_name="Описание")
     cooking_time = models.PositiveSmallIntegerField(
         verbose_name="Время приготовления",
         validators=[MinValueValidator(
             1, message="Время должно быть не меньше одной минуты.")])
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="В избранном",)
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,)
 
     class Meta:
         ordering = ['-id']
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
+        indexes = [
+            models.Index(
+                fields=("author", "-id"),
+                name="recipe_author_id_idx"),
+            GinIndex(
+                fields=("search_vector",),
+                name="recipe_search_vector_idx"), ]
 
     def __str__(self):
         return self.name
@@ -97,7 +162,8 @@ class IngredientRecipe(models.Model):
         Recipe,
         on_delete=models.CASCADE,
         related_name="ingredientrecipe",
-        verbose_name="Рецепт",)
+        verbose_name="Рецепт",
+        db_index=False,)
     amount = models.PositiveSmallIntegerField(
         verbose_name="Количество",
         validators=[MinValueValidator(
@@ -112,17 +178,122 @@ class IngredientRecipe(models.Model):
                 name="unique_ingredient_recipe"), ]
 
 
+class RecipeChange(models.Model):
+    """Модель для записи журнала изменений рецептов.
+
+    По журналу индексы рецептов в памяти процессов догоняют базу.
+    Ссылка на рецепт не внешний ключ, так как записи об удаленных
+    рецептах должны оставаться в журнале."""
+
+    recipe = models.BigIntegerField(
+        verbose_name="Рецепт",)
+
+    class Meta:
+        verbose_name = "Изменение рецепта"
+        verbose_name_plural = "Изменения рецептов"
+
+
+class SimilarRecipe(models.Model):
+    """Модель для похожих рецептов, рассчитанных командой similar_recipes."""
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="similar",
+        verbose_name="Рецепт",
+        db_index=False,)
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Похожий рецепт",)
+    score = models.FloatField(
+        verbose_name="Сходство",)
+
+    class Meta:
+        verbose_name = "Похожий рецепт"
+        verbose_name_plural = "Похожие рецепты"
+        constraints = [
+            models.UniqueConstraint(
+                fields=("recipe", "similar"),
+                name="unique_similar_recipe"), ]
+        indexes = [
+            models.Index(
+                fields=("recipe", "-score"),
+                name="similar_recipe_score_idx"), ]
+
+
+class RecipeScore(models.Model):
+    """Модель для оценок популярности рецепта.
+
+    Оценки пересчитывает команда update_recipe_scores по избранному и
+    спискам покупок с затуханием по времени."""
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="score",
+        verbose_name="Рецепт",)
+    popular = models.FloatField(
+        default=0,
+        verbose_name="Популярность",)
+    trending = models.FloatField(
+        default=0,
+        verbose_name="В тренде",)
+
+    class Meta:
+        verbose_name = "Оценка рецепта"
+        verbose_name_plural = "Оценки рецептов"
+        indexes = [
+            models.Index(
+                fields=("-popular", "-recipe"),
+                name="recipescore_popular_idx"),
+            models.Index(
+                fields=("-trending", "-recipe"),
+                name="recipescore_trending_idx"), ]
+
+
+class TimelineEntry(models.Model):
+    """Модель для рецепта в ленте подписок пользователя."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="timeline",
+        verbose_name="Пользователь",
+        db_index=False,)
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Рецепт",)
+
+    class Meta:
+        verbose_name = "Рецепт в ленте"
+        verbose_name_plural = "Рецепты в ленте"
+        constraints = [
+            models.UniqueConstraint(
+                fields=("user", "recipe"),
+                name="unique_timeline_entry"), ]
+
+
 class Favorite(models.Model):
     """Модель для добавления в избранное."""
 
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
-        verbose_name="Пользователь",)
+        verbose_name="Пользователь",
+        db_index=False,)
     recipe = models.ForeignKey(
         Recipe,
         on_delete=models.CASCADE,
-        verbose_name="Рецепт",)
+        verbose_name="Рецепт",
+        db_index=False,)
+    created = models.DateTimeField(
+        default=timezone.now,
+        verbose_name="Добавлено",)
 
     class Meta:
         verbose_name = "Рецепт в избранном"
@@ -131,6 +302,10 @@ class Favorite(models.Model):
             models.UniqueConstraint(
                 fields=("user", "recipe"),
                 name="unique_favorite"), ]
+        indexes = [
+            models.Index(
+                fields=("recipe", "user"),
+                name="favorite_recipe_user_idx"), ]
 
     def __str__(self):
         return f"{self.user}: {self.recipe}"
@@ -143,12 +318,17 @@ class ShoppingCart(models.Model):
         User,
         related_name='shoppingcart',
         on_delete=models.CASCADE,
-        verbose_name="Пользователь")
+        verbose_name="Пользователь",
+        db_index=False,)
     recipe = models.ForeignKey(
         Recipe,
         related_name='shoppingcart',
         on_delete=models.CASCADE,
-        verbose_name="Рецепт",)
+        verbose_name="Рецепт",
+        db_index=False,)
+    created = models.DateTimeField(
+        default=timezone.now,
+        verbose_name="Добавлено",)
 
     class Meta:
         verbose_name = "Список покупок"
@@ -157,3 +337,33 @@ class ShoppingCart(models.Model):
             models.UniqueConstraint(
                 fields=("user", "recipe"),
                 name="unique_shoppingcart"), ]
+        indexes = [
+            models.Index(
+                fields=("recipe", "user"),
+                name="shoppingcart_recipe_user_idx"), ]
+
+
+class ShoppingListItem(models.Model):
+    """Модель для суммарного количества ингредиента в списке покупок."""
+
+    user = models.ForeignKey(
+        User,
+        related_name="shopping_list",
+        on_delete=models.CASCADE,
+        verbose_name="Пользователь",
+        db_index=False,)
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name="Ингредиент",)
+    total = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Количество",)
+
+    class Meta:
+        verbose_name = "Ингредиент в списке покупок"
+        verbose_name_plural = "Ингредиенты в списке покупок"
+        constraints = [
+            models.UniqueConstraint(
+                fields=("user", "ingredient"),
+                name="unique_shopping_list_item"), ]
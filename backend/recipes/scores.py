@@ -0,0 +1,57 @@
+import math
+
+from django.db import connection
+from django.utils import timezone
+
+from recipes.models import Favorite, Recipe, RecipeScore, ShoppingCart
+
+DAY = 24 * 60 * 60
+POPULAR_HALF_LIFE = 30 * DAY
+TRENDING_HALF_LIFE = DAY
+FAVORITE_WEIGHT = 1.0
+SHOPPING_CART_WEIGHT = 1.5
+MAX_DECAY_EXPONENT = 700
+
+RECIPE = Recipe._meta.db_table
+SCORE = RecipeScore._meta.db_table
+DECAY_SQL = (
+    "SUM(weight * EXP(-LEAST(age / {scale}, %(max_exponent)s)))")
+UPDATE_SQL = (
+    f"INSERT INTO {SCORE} (recipe_id, popular, trending) "
+    f"SELECT {RECIPE}.id, COALESCE(events.popular, 0), "
+    f"COALESCE(events.trending, 0) FROM {RECIPE} LEFT JOIN ("
+    "SELECT recipe_id, "
+    f"{DECAY_SQL.format(scale='%(popular)s')} AS popular, "
+    f"{DECAY_SQL.format(scale='%(trending)s')} AS trending FROM ("
+    "SELECT recipe_id, %(favorite)s::float8 AS weight, "
+    "EXTRACT(EPOCH FROM %(now)s - created)::float8 AS age "
+    f"FROM {Favorite._meta.db_table} UNION ALL "
+    "SELECT recipe_id, %(cart)s::float8, "
+    "EXTRACT(EPOCH FROM %(now)s - created)::float8 "
+    f"FROM {ShoppingCart._meta.db_table}) actions GROUP BY recipe_id"
+    f") events ON events.recipe_id = {RECIPE}.id "
+    "ON CONFLICT (recipe_id) DO UPDATE SET "
+    "popular = EXCLUDED.popular, trending = EXCLUDED.trending "
+    f"WHERE ({SCORE}.popular, {SCORE}.trending) "
+    "IS DISTINCT FROM (EXCLUDED.popular, EXCLUDED.trending)")
+
+
+def update_scores(now=None):
+    """Пересчитывает оценки всех рецептов одним INSERT ... ON CONFLICT.
+
+    Каждое добавление в избранное или список покупок дает вклад,
+    который убывает вдвое за период полураспада: месяц для
+    популярности, сутки для трендов. Рецептам без оценки создаются
+    строки с нулями, неизменившиеся строки не перезаписываются.
+    Возвращает число обновленных строк."""
+
+    with connection.cursor() as cursor:
+        cursor.execute(UPDATE_SQL, {
+            "now": now or timezone.now(),
+            "popular": POPULAR_HALF_LIFE / math.log(2),
+            "trending": TRENDING_HALF_LIFE / math.log(2),
+            "favorite": FAVORITE_WEIGHT,
+            "cart": SHOPPING_CART_WEIGHT,
+            "max_exponent": MAX_DECAY_EXPONENT,
+        })
+        return cursor.rowcount
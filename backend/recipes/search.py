@@ -0,0 +1,37 @@
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchQuery, SearchVector
+from django.db.models import OuterRef, Subquery
+
+from recipes.models import IngredientRecipe
+
+SEARCH_CONFIG = "russian"
+
+
+def get_search_vector():
+    """Поисковый вектор рецепта: название важнее ингредиентов,
+    ингредиенты важнее описания."""
+
+    ingredients = Subquery(
+        IngredientRecipe.objects.filter(recipe=OuterRef("pk"))
+        .order_by().values("recipe")
+        .annotate(names=StringAgg("ingredient__name", " "))
+        .values("names"))
+    return (
+        SearchVector("name", weight="A", config=SEARCH_CONFIG)
+        + SearchVector(ingredients, weight="B", config=SEARCH_CONFIG)
+        + SearchVector("text", weight="C", config=SEARCH_CONFIG))
+
+
+def get_search_query(value):
+    """Запрос в синтаксисе веб-поиска: слова, «фразы», OR и -исключения."""
+
+    return SearchQuery(value, config=SEARCH_CONFIG, search_type="websearch")
+
+
+def update_search_vectors(recipes):
+    """Пересчитывает поисковые векторы рецептов из queryset одним UPDATE.
+
+    Вызывается после изменения рецепта и его ингредиентов, так как
+    вектор хранится в таблице рецептов."""
+
+    recipes.update(search_vector=get_search_vector())
@@ -0,0 +1,108 @@
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Greatest
+
+from recipes.models import IngredientRecipe, ShoppingListItem
+
+BATCH_SIZE = 5000
+
+
+def get_amount(recipe):
+    return Subquery(IngredientRecipe.objects.filter(
+        recipe=recipe, ingredient=OuterRef("ingredient")).values("amount"))
+
+
+def add_recipe(recipe, user_ids):
+    """Прибавляет ингредиенты рецепта к спискам покупок пользователей."""
+
+    if not user_ids:
+        return
+    ingredient_ids = list(IngredientRecipe.objects.filter(
+        recipe=recipe).values_list("ingredient_id", flat=True))
+    ShoppingListItem.objects.bulk_create(
+        (ShoppingListItem(user_id=user_id, ingredient_id=ingredient_id)
+         for user_id in user_ids for ingredient_id in ingredient_ids),
+        ignore_conflicts=True)
+    ShoppingListItem.objects.filter(
+        user_id__in=user_ids, ingredient_id__in=ingredient_ids).update(
+        total=F("total") + get_amount(recipe))
+
+
+def remove_recipe(recipe, user_ids):
+    """Вычитает ингредиенты рецепта из списков покупок пользователей."""
+
+    if not user_ids:
+        return
+    items = ShoppingListItem.objects.filter(
+        user_id__in=user_ids,
+        ingredient__ingredientrecipe__recipe=recipe)
+    items.update(total=Greatest(F("total") - get_amount(recipe), 0))
+    ShoppingListItem.objects.filter(
+        user_id__in=user_ids, total=0).delete()
+
+
+def get_live_totals(user_ids=None):
+    """Считает списки покупок заново по рецептам в корзинах."""
+
+    if user_ids is None:
+        ingredients = IngredientRecipe.objects.filter(
+            recipe__shoppingcart__isnull=False)
+    else:
+        ingredients = IngredientRecipe.objects.filter(
+            recipe__shoppingcart__user_id__in=user_ids)
+    return (
+        ingredients
+        .values_list("recipe__shoppingcart__user_id", "ingredient_id")
+        .annotate(total=Sum("amount"))
+        .order_by("recipe__shoppingcart__user_id", "ingredient_id")
+        .iterator(chunk_size=BATCH_SIZE))
+
+
+@transaction.atomic
+def rebuild(user_ids=None):
+    """Пересобирает списки покупок всех или указанных пользователей."""
+
+    items = ShoppingListItem.objects.all()
+    if user_ids is not None:
+        items = items.filter(user_id__in=user_ids)
+    items.delete()
+    totals = get_live_totals(user_ids)
+    while True:
+        batch = list(islice(totals, BATCH_SIZE))
+        if not batch:
+            break
+        ShoppingListItem.objects.bulk_create(
+            ShoppingListItem(user_id=user_id, ingredient_id=ingredient_id,
+                             total=total)
+            for user_id, ingredient_id, total in batch)
+
+
+def find_mismatches(user_ids=None):
+    """Сравнивает списки покупок с живой агрегацией по корзинам.
+
+    Обе выборки упорядочены по пользователю и ингредиенту и сливаются
+    за один проход, поэтому проверка не держит данные в памяти.
+    Возвращает пары (ожидаемое, сохраненное) для расхождений."""
+
+    items = ShoppingListItem.objects.filter(total__gt=0)
+    if user_ids is not None:
+        items = items.filter(user_id__in=user_ids)
+    stored = items.values_list(
+        "user_id", "ingredient_id", "total").order_by(
+        "user_id", "ingredient_id").iterator(chunk_size=BATCH_SIZE)
+    live = get_live_totals(user_ids)
+    expected, actual = next(live, None), next(stored, None)
+    while expected is not None or actual is not None:
+        if actual is None or (
+                expected is not None and expected[:2] < actual[:2]):
+            yield expected, None
+            expected = next(live, None)
+        elif expected is None or expected[:2] > actual[:2]:
+            yield None, actual
+            actual = next(stored, None)
+        else:
+            if expected != actual:
+                yield expected, actual
+            expected, actual = next(live, None), next(stored, None)
@@ -0,0 +1,86 @@
+from django.db.models import F
+
+from recipes import shopping_list
+from recipes.changes import log_recipe_changes
+from recipes.models import Ingredient, Recipe, RecipeScore
+from recipes.scores import update_scores
+from recipes.search import update_search_vectors
+from recipes.utils import normalize_name
+from users.models import User
+
+
+def fill_search_names(sender, **kwargs):
+    """Заполняет поисковые названия ингредиентов, добавленных
+    до появления поля search_name."""
+
+    ingredients = list(Ingredient.objects.filter(search_name=""))
+    for ingredient in ingredients:
+        ingredient.search_name = normalize_name(ingredient.name)
+    Ingredient.objects.bulk_update(
+        ingredients, ["search_name"], batch_size=1000)
+
+
+def increment_favorites_count(sender, instance, created, **kwargs):
+    if created:
+        Recipe.objects.filter(pk=instance.recipe_id).update(
+            favorites_count=F("favorites_count") + 1)
+
+
+def decrement_favorites_count(sender, instance, **kwargs):
+    Recipe.objects.filter(pk=instance.recipe_id).update(
+        favorites_count=F("favorites_count") - 1)
+
+
+def increment_recipes_count(sender, instance, created, **kwargs):
+    if created:
+        User.objects.filter(pk=instance.author_id).update(
+            recipes_count=F("recipes_count") + 1)
+
+
+def decrement_recipes_count(sender, instance, **kwargs):
+    User.objects.filter(pk=instance.author_id).update(
+        recipes_count=F("recipes_count") - 1)
+
+
+def fill_search_vectors(sender, **kwargs):
+    """Заполняет поисковые векторы рецептов, созданных до появления
+    поля search_vector."""
+
+    update_search_vectors(Recipe.objects.filter(search_vector=None))
+
+
+def update_ingredient_search_vectors(sender, instance, created, **kwargs):
+    """Пересчитывает векторы рецептов при переименовании ингредиента."""
+
+    if not created:
+        update_search_vectors(Recipe.objects.filter(
+            ingredientrecipe__ingredient=instance))
+
+
+def remove_from_shopping_lists(sender, instance, **kwargs):
+    """Вычитает удаляемый рецепт из списков покупок, в том числе при
+    каскадном удалении вместе с автором и удалении из админки."""
+
+    shopping_list.remove_recipe(instance, list(
+        instance.shoppingcart.values_list("user_id", flat=True)))
+
+
+def log_deleted_recipe(sender, instance, **kwargs):
+    """Отмечает удаленный рецепт в журнале для индекса продуктов."""
+
+    log_recipe_changes([instance.pk])
+
+
+def create_recipe_score(sender, instance, created, **kwargs):
+    """Создает нулевые оценки нового рецепта, чтобы он попадал в
+    сортировку по популярности до пересчета."""
+
+    if created:
+        RecipeScore.objects.create(recipe=instance)
+
+
+def fill_recipe_scores(sender, **kwargs):
+    """Рассчитывает оценки рецептов, созданных до появления RecipeScore."""
+
+    if Recipe.objects.filter(score=None).exists():
+        update_scores()
@@ -0,0 +1,123 @@
+import numpy as np
+from django.db import connection, transaction
+from scipy import sparse
+
+from recipes.models import IngredientRecipe, Recipe, SimilarRecipe
+
+NEIGHBOURS = 10
+BATCH_SIZE = 1000
+SAVE_BATCH_SIZE = 5000
+INSERT_SQL = (
+    f"INSERT INTO {SimilarRecipe._meta.db_table} "
+    "(recipe_id, similar_id, score) "
+    "SELECT * FROM unnest(%s::bigint[], %s::bigint[], %s::float8[])")
+
+
+def load_pairs(queryset, field):
+    """Загружает пары (id рецепта, id признака) в массив numpy."""
+
+    values = queryset.values_list("recipe_id", field).order_by()
+    return np.array(
+        list(values.iterator(chunk_size=10000)), dtype=np.int64
+    ).reshape(-1, 2)
+
+
+def tfidf(rows, columns, shape):
+    """Разреженная матрица TF-IDF по бинарным признакам: редкий
+    ингредиент говорит о сходстве рецептов больше, чем соль."""
+
+    matrix = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, columns)),
+        shape=shape)
+    matrix.sum_duplicates()
+    matrix.data[:] = 1
+    frequency = np.bincount(columns, minlength=shape[1])
+    idf = np.log((1 + shape[0]) / (1 + frequency)) + 1
+    return (matrix @ sparse.diags(idf.astype(np.float32))).tocsr()
+
+
+def build_features():
+    """Строит нормированные матрицы рецептов по ингредиентам и тегам.
+
+    Ингредиенты хранятся в разреженной матрице, теги - в плотной
+    транспонированной, так как их мало, а общий тег есть почти у любой
+    пары рецептов. Возвращает id рецептов по строкам и обе матрицы."""
+
+    ingredients = load_pairs(IngredientRecipe.objects.all(), "ingredient_id")
+    tags = load_pairs(Recipe.tags.through.objects.all(), "tag_id")
+    recipe_ids = np.unique(ingredients[:, 0])
+    tags = tags[np.isin(tags[:, 0], recipe_ids)]
+    ingredient_ids, ingredient_columns = np.unique(
+        ingredients[:, 1], return_inverse=True)
+    tag_ids, tag_columns = np.unique(tags[:, 1], return_inverse=True)
+    ingredient_matrix = tfidf(
+        np.searchsorted(recipe_ids, ingredients[:, 0]), ingredient_columns,
+        (len(recipe_ids), len(ingredient_ids)))
+    tag_matrix = tfidf(
+        np.searchsorted(recipe_ids, tags[:, 0]), tag_columns,
+        (len(recipe_ids), len(tag_ids))).toarray()
+    norms = np.sqrt(
+        np.asarray(ingredient_matrix.multiply(ingredient_matrix).sum(1))
+        .ravel() + (tag_matrix ** 2).sum(1))
+    scale = 1 / np.maximum(norms, 1e-12)
+    ingredient_matrix = sparse.diags(scale) @ ingredient_matrix
+    tag_matrix *= scale[:, None]
+    return recipe_ids, ingredient_matrix.tocsr(), tag_matrix.T.copy()
+
+
+def find_neighbours(ingredients, tags, count=NEIGHBOURS,
+                    batch_size=BATCH_SIZE):
+    """Находит для каждого рецепта count ближайших по косинусу.
+
+    Кандидаты - рецепты хотя бы с одним общим ингредиентом, их дает
+    произведение разреженных матриц по пачкам строк, к нему
+    добавляется вклад общих тегов. Внутри пачки пары сортируются
+    одним argsort по ключу «строка, затем убывание сходства».
+    Отдает по пачкам массивы (строка рецепта, строка соседа, сходство)."""
+
+    transposed = ingredients.T.tocsr()
+    for start in range(0, ingredients.shape[0], batch_size):
+        product = (ingredients[start:start + batch_size] @ transposed).tocoo()
+        rows, columns = product.row + start, product.col
+        keep = rows != columns
+        rows, columns = rows[keep], columns[keep]
+        scores = product.data[keep].astype(np.float64)
+        for tag in tags:
+            scores += tag[rows] * tag[columns]
+        order = np.argsort(rows * 4.0 + (2.0 - scores))
+        rows, columns, scores = rows[order], columns[order], scores[order]
+        rank = np.arange(len(rows)) - np.searchsorted(rows, rows)
+        keep = rank < count
+        yield rows[keep], columns[keep], scores[keep]
+
+
+def insert_neighbours(recipe_ids, similar_ids, scores):
+    """Сохраняет пачку соседей, в PostgreSQL - одним INSERT из массивов."""
+
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(INSERT_SQL, [recipe_ids, similar_ids, scores])
+        return
+    SimilarRecipe.objects.bulk_create((
+        SimilarRecipe(recipe_id=recipe_id, similar_id=similar_id,
+                      score=score)
+        for recipe_id, similar_id, score in zip(
+            recipe_ids, similar_ids, scores)), batch_size=SAVE_BATCH_SIZE)
+
+
+def save_neighbours(count=NEIGHBOURS, batch_size=BATCH_SIZE):
+    """Пересчитывает таблицу похожих рецептов целиком в одной транзакции,
+    до ее завершения эндпоинт отдает прежних соседей.
+    Возвращает число сохраненных пар."""
+
+    recipe_ids, ingredients, tags = build_features()
+    saved = 0
+    with transaction.atomic():
+        SimilarRecipe.objects.all().delete()
+        for rows, columns, scores in find_neighbours(
+                ingredients, tags, count, batch_size):
+            insert_neighbours(
+                recipe_ids[rows].tolist(), recipe_ids[columns].tolist(),
+                scores.tolist())
+            saved += len(rows)
+    return saved
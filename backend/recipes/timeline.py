@@ -0,0 +1,150 @@
+from collections import defaultdict
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection
+
+from recipes.models import Recipe, TimelineEntry
+from users.models import Follow, User
+
+BATCH_SIZE = 1000
+UNION_SIZE = 100
+TRIM_SQL = """
+    DELETE FROM {entries} entry
+    USING (
+        SELECT users.id AS user_id, (
+            SELECT recipe_id FROM {entries}
+            WHERE user_id = users.id
+            ORDER BY recipe_id DESC
+            OFFSET %(size)s LIMIT 1) AS oldest
+        FROM unnest(%(user_ids)s::bigint[]) AS users(id)) feeds
+    WHERE entry.user_id = feeds.user_id AND entry.recipe_id <= feeds.oldest
+""".format(entries=TimelineEntry._meta.db_table)
+
+
+def latest_recipe_ids(author_ids, limit, before=None):
+    """Возвращает id последних limit рецептов каждого автора.
+
+    Запросы по авторам объединяются через UNION ALL, каждая часть
+    читает индекс (author, -id) и останавливается через limit строк."""
+
+    author_ids = list(author_ids)
+    recipe_ids = []
+    for start in range(0, len(author_ids), UNION_SIZE):
+        querysets = []
+        for author_id in author_ids[start:start + UNION_SIZE]:
+            recipes = Recipe.objects.filter(author_id=author_id)
+            if before is not None:
+                recipes = recipes.filter(id__lt=before)
+            querysets.append(recipes.order_by("-id").values_list(
+                "id", flat=True)[:limit])
+        recipe_ids += querysets[0].union(*querysets[1:], all=True)
+    return recipe_ids
+
+
+def add_latest(user_id, author_ids):
+    """Добавляет в ленту пользователя последние рецепты авторов."""
+
+    recipe_ids = sorted(
+        latest_recipe_ids(author_ids, settings.FEED_SIZE),
+        reverse=True)[:settings.FEED_SIZE]
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, recipe_id=recipe_id)
+         for recipe_id in recipe_ids),
+        batch_size=BATCH_SIZE, ignore_conflicts=True)
+
+
+def push(recipes):
+    """Раскладывает новые рецепты по лентам подписчиков их авторов.
+
+    Подписчики обрабатываются пачками по BATCH_SIZE, после каждой
+    пачки их ленты обрезаются до FEED_SIZE записей. Авторы, у которых
+    больше FEED_FANOUT_MAX_FOLLOWERS подписчиков, пропускаются: их
+    рецепты дочитываются при запросе ленты."""
+
+    recipe_ids = defaultdict(list)
+    for recipe in sorted(recipes, key=lambda recipe: recipe.id):
+        recipe_ids[recipe.author_id].append(recipe.id)
+    follows = Follow.objects.filter(
+        author_id__in=recipe_ids,
+        author__followers_count__lte=settings.FEED_FANOUT_MAX_FOLLOWERS
+    ).order_by("user_id").values_list("user_id", "author_id").iterator(
+        chunk_size=BATCH_SIZE)
+    while True:
+        batch = list(islice(follows, BATCH_SIZE))
+        if not batch:
+            break
+        TimelineEntry.objects.bulk_create(
+            (TimelineEntry(user_id=user_id, recipe_id=recipe_id)
+             for user_id, author_id in batch
+             for recipe_id in recipe_ids[author_id][-settings.FEED_SIZE:]),
+            batch_size=BATCH_SIZE, ignore_conflicts=True)
+        trim({user_id for user_id, _ in batch})
+
+
+def backfill(user_id, author_ids):
+    """Добавляет в ленту рецепты авторов, на которых пользователь
+    только что подписался, и обрезает ленту до FEED_SIZE записей."""
+
+    author_ids = list(User.objects.filter(
+        id__in=author_ids,
+        followers_count__lte=settings.FEED_FANOUT_MAX_FOLLOWERS
+    ).values_list("id", flat=True))
+    if author_ids:
+        add_latest(user_id, author_ids)
+        trim([user_id])
+
+
+def remove_authors(user_id, author_ids):
+    """Убирает из ленты рецепты авторов, от которых пользователь отписался."""
+
+    TimelineEntry.objects.filter(
+        user_id=user_id, recipe__author_id__in=author_ids).delete()
+
+
+def trim(user_ids):
+    """Удаляет из лент пользователей записи старше FEED_SIZE последних.
+
+    Все ленты обрезаются одним запросом: для каждого пользователя
+    граница находится по индексу (user, recipe)."""
+
+    with connection.cursor() as cursor:
+        cursor.execute(TRIM_SQL, {
+            "size": settings.FEED_SIZE, "user_ids": list(user_ids)})
+
+
+def get_feed(user_id, limit, before=None):
+    """Возвращает id рецептов ленты от новых к старым.
+
+    Записи ленты дополняются последними рецептами авторов с большим
+    числом подписчиков, которые не раскладываются по лентам."""
+
+    entries = TimelineEntry.objects.filter(user_id=user_id)
+    if before is not None:
+        entries = entries.filter(recipe_id__lt=before)
+    recipe_ids = set(entries.order_by("-recipe_id").values_list(
+        "recipe_id", flat=True)[:limit])
+    popular = Follow.objects.filter(
+        user_id=user_id,
+        author__followers_count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS
+    ).values_list("author_id", flat=True)
+    recipe_ids.update(latest_recipe_ids(popular, limit, before))
+    return sorted(recipe_ids, reverse=True)[:limit]
+
+
+def rebuild(user_ids=None):
+    """Пересобирает ленты всех или указанных пользователей по подпискам."""
+
+    entries = TimelineEntry.objects.all()
+    follows = Follow.objects.filter(
+        author__followers_count__lte=settings.FEED_FANOUT_MAX_FOLLOWERS)
+    if user_ids is not None:
+        entries = entries.filter(user_id__in=user_ids)
+        follows = follows.filter(user_id__in=user_ids)
+    entries.delete()
+    authors = defaultdict(list)
+    for user_id, author_id in follows.values_list(
+            "user_id", "author_id").iterator(chunk_size=BATCH_SIZE):
+        authors[user_id].append(author_id)
+    for user_id, author_ids in authors.items():
+        add_latest(user_id, author_ids)
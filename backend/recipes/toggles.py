@@ -0,0 +1,125 @@
+from django.db import connection, transaction
+from django.utils import timezone
+
+from recipes import shopping_list
+from recipes.models import (Favorite, IngredientRecipe, Recipe, ShoppingCart,
+                            ShoppingListItem)
+
+RECIPE = Recipe._meta.db_table
+INGREDIENT_RECIPE = IngredientRecipe._meta.db_table
+SHOPPING_LIST_ITEM = ShoppingListItem._meta.db_table
+
+ADD_SQL = (
+    "WITH added AS ("
+    "INSERT INTO {table} (user_id, recipe_id, created) "
+    f"SELECT %(user)s, id, %(now)s FROM {RECIPE} WHERE id = ANY(%(ids)s) "
+    "ON CONFLICT DO NOTHING RETURNING recipe_id){changes} "
+    f"SELECT {RECIPE}.* FROM {RECIPE} "
+    f"JOIN added ON {RECIPE}.id = added.recipe_id ORDER BY {RECIPE}.id DESC")
+REMOVE_SQL = (
+    "WITH removed AS ("
+    "DELETE FROM {table} "
+    "WHERE user_id = %(user)s AND recipe_id = ANY(%(ids)s) "
+    "RETURNING recipe_id){changes} "
+    "SELECT recipe_id FROM removed")
+FAVORITES_COUNT_SQL = (
+    f", counted AS (UPDATE {RECIPE} "
+    "SET favorites_count = favorites_count {sign} 1 "
+    "WHERE id IN (SELECT recipe_id FROM {rows}))")
+AMOUNTS_SQL = (
+    ", amounts AS ("
+    f"SELECT ingredient_id, SUM(amount) AS amount FROM {INGREDIENT_RECIPE} "
+    "WHERE recipe_id IN (SELECT recipe_id FROM {rows}) "
+    "GROUP BY ingredient_id)")
+SHOPPING_LIST_ADD_SQL = AMOUNTS_SQL.format(rows="added") + (
+    ", totals AS ("
+    f"INSERT INTO {SHOPPING_LIST_ITEM} (user_id, ingredient_id, total) "
+    "SELECT %(user)s, ingredient_id, amount FROM amounts "
+    "ON CONFLICT (user_id, ingredient_id) DO UPDATE "
+    f"SET total = {SHOPPING_LIST_ITEM}.total + EXCLUDED.total)")
+SHOPPING_LIST_REMOVE_SQL = AMOUNTS_SQL.format(rows="removed") + (
+    f", emptied AS (DELETE FROM {SHOPPING_LIST_ITEM} item USING amounts "
+    "WHERE item.user_id = %(user)s "
+    "AND item.ingredient_id = amounts.ingredient_id "
+    "AND item.total <= amounts.amount)"
+    f", reduced AS (UPDATE {SHOPPING_LIST_ITEM} item "
+    "SET total = item.total - amounts.amount FROM amounts "
+    "WHERE item.user_id = %(user)s "
+    "AND item.ingredient_id = amounts.ingredient_id "
+    "AND item.total > amounts.amount)")
+
+
+def add(model, changes, user_id, recipe_ids, on_add=None):
+    """Добавляет рецепты в избранное или корзину пользователя.
+
+    В PostgreSQL это один запрос INSERT ... ON CONFLICT DO NOTHING,
+    который заодно обновляет счетчики и список покупок, поэтому
+    повторные и одновременные запросы не приводят к ошибкам.
+    Возвращает только что добавленные рецепты, уже добавленные и
+    несуществующие пропускаются."""
+
+    recipe_ids = [int(recipe_id) for recipe_id in recipe_ids]
+    if connection.vendor == "postgresql":
+        return list(Recipe.objects.raw(
+            ADD_SQL.format(table=model._meta.db_table, changes=changes),
+            {"user": user_id, "ids": recipe_ids, "now": timezone.now()}))
+    with transaction.atomic():
+        existing = model.objects.filter(
+            user_id=user_id, recipe_id__in=recipe_ids).values("recipe_id")
+        recipes = list(Recipe.objects.filter(
+            id__in=recipe_ids).exclude(id__in=existing))
+        for recipe in recipes:
+            model.objects.create(user_id=user_id, recipe=recipe)
+            if on_add is not None:
+                on_add(recipe, [user_id])
+    return recipes
+
+
+def remove(model, changes, user_id, recipe_ids, on_remove=None):
+    """Убирает рецепты из избранного или корзины одним DELETE ... RETURNING.
+
+    Возвращает id рецептов, которые действительно были удалены."""
+
+    recipe_ids = [int(recipe_id) for recipe_id in recipe_ids]
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                REMOVE_SQL.format(
+                    table=model._meta.db_table, changes=changes),
+                {"user": user_id, "ids": recipe_ids})
+            return [recipe_id for recipe_id, in cursor.fetchall()]
+    with transaction.atomic():
+        objects = model.objects.filter(
+            user_id=user_id, recipe_id__in=recipe_ids).select_related(
+            "recipe")
+        removed = []
+        for obj in objects:
+            obj.delete()
+            if on_remove is not None:
+                on_remove(obj.recipe, [user_id])
+            removed.append(obj.recipe_id)
+    return removed
+
+
+def add_favorites(user_id, recipe_ids):
+    return add(
+        Favorite, FAVORITES_COUNT_SQL.format(sign="+", rows="added"),
+        user_id, recipe_ids)
+
+
+def remove_favorites(user_id, recipe_ids):
+    return remove(
+        Favorite, FAVORITES_COUNT_SQL.format(sign="-", rows="removed"),
+        user_id, recipe_ids)
+
+
+def add_to_shopping_cart(user_id, recipe_ids):
+    return add(
+        ShoppingCart, SHOPPING_LIST_ADD_SQL, user_id, recipe_ids,
+        shopping_list.add_recipe)
+
+
+def remove_from_shopping_cart(user_id, recipe_ids):
+    return remove(
+        ShoppingCart, SHOPPING_LIST_REMOVE_SQL, user_id, recipe_ids,
+        shopping_list.remove_recipe)
@@ -0,0 +1,37 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchVector
+
+WORDS_CONFIG = "simple"
+WORD_PATTERN = re.compile(r"[^\W_]+")
+
+
+def normalize_name(name):
+    """Приводит название к виду для поиска: без регистра, «ё» как «е»."""
+
+    return name.casefold().replace("ё", "е").strip()
+
+
+def get_words(name):
+    """Разбивает поисковое название на слова."""
+
+    return WORD_PATTERN.findall(name)
+
+
+def get_name_words():
+    """Вектор слов поискового названия, по нему построен GIN-индекс."""
+
+    return SearchVector("search_name", config=WORDS_CONFIG)
+
+
+def get_words_query(name):
+    """Запрос, в котором каждое слово - начало какого-то слова названия.
+
+    Возвращает None, если в названии нет слов."""
+
+    words = get_words(name)
+    if not words:
+        return None
+    return SearchQuery(
+        " & ".join(f"{word}:*" for word in words),
+        config=WORDS_CONFIG, search_type="raw")
@@ -0,0 +1,83 @@
+import base64
+import io
+
+import pytest
+from django.core.cache import cache
+from PIL import Image
+from rest_framework.test import APIClient
+
+from api import benchmark
+from recipes.models import Ingredient, IngredientRecipe, Recipe, Tag
+from users.models import User
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Версии справочников и ответы в кеше не переходят между тестами."""
+
+    cache.clear()
+
+
+@pytest.fixture
+def benchmark_data(db):
+    """Небольшой синтетический набор данных бенчмарка."""
+
+    benchmark.seed(users=50, recipes=300, follows=5, favorites=5, cart=3)
+
+
+@pytest.fixture
+def image_data():
+    """Картинка PNG 10x10 в виде data URI."""
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (10, 10), "red").save(buffer, "PNG")
+    return "data:image/png;base64," + base64.b64encode(
+        buffer.getvalue()).decode()
+
+
+@pytest.fixture
+def user(db):
+    return User.objects.create_user(
+        username="user", email="user@example.com", password="password")
+
+
+@pytest.fixture
+def user_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def make_author(db):
+    """Создает автора с номером в логине и почте."""
+
+    def make_author(number):
+        return User.objects.create_user(
+            username=f"author{number}", email=f"author{number}@example.com",
+            password="password")
+
+    return make_author
+
+
+@pytest.fixture
+def make_recipe(db):
+    """Создает рецепт автора с двумя тегами и тремя ингредиентами."""
+
+    tags = [Tag.objects.create(name=name, color=color, slug=slug)
+            for name, color, slug in benchmark.TAGS[:2]]
+    ingredients = Ingredient.objects.bulk_create(
+        Ingredient(name=name, measurement_unit="г")
+        for name in ("мука", "молоко", "сахар"))
+
+    def make_recipe(author, name="Рецепт"):
+        recipe = Recipe.objects.create(
+            name=name, author=author, image="images/recipe.png",
+            text="Описание рецепта", cooking_time=10)
+        recipe.tags.set(tags)
+        IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(recipe=recipe, ingredient=ingredient, amount=100)
+            for ingredient in ingredients)
+        return recipe
+
+    return make_recipe
@@ -0,0 +1,22 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Tag
+
+
+def test_not_modified_without_queries(
+        settings, user_client, django_capture_on_commit_callbacks):
+    """С общим кешем 304 отдается без запросов к базе, а новая версия
+    справочника после изменения тега сразу видна."""
+
+    settings.SHARED_CACHE = True
+    etag = user_client.get("/api/tags/")["ETag"]
+    with CaptureQueriesContext(connection) as queries:
+        response = user_client.get("/api/tags/", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert len(queries) == 0
+    with django_capture_on_commit_callbacks(execute=True):
+        Tag.objects.create(name="Ужин", color="#8775D2", slug="dinner")
+    response = user_client.get("/api/tags/", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert [tag["slug"] for tag in response.json()] == ["dinner"]
@@ -0,0 +1,48 @@
+import csv
+import io
+import json
+
+import pytest
+
+from recipes import toggles
+
+
+@pytest.fixture
+def cart(user, make_recipe):
+    toggles.add_to_shopping_cart(
+        user.id, [make_recipe(user).id, make_recipe(user, "Второй").id])
+
+
+def download(client, **params):
+    response = client.get("/api/recipes/download_shopping_cart/", params)
+    assert response.status_code == 200
+    return response, b"".join(response.streaming_content).decode()
+
+
+def test_download_text(user_client, cart):
+    response, content = download(user_client)
+    assert response["Content-Type"] == "text/plain; charset=utf-8"
+    assert 'filename="shopping_list.txt"' in response["Content-Disposition"]
+    assert content == (
+        "Список покупок:\n\nмолоко - 200 г\nмука - 200 г\nсахар - 200 г")
+
+
+def test_download_csv(user_client, cart):
+    response, content = download(user_client, format="csv")
+    assert response["Content-Type"] == "text/csv; charset=utf-8"
+    assert list(csv.reader(io.StringIO(content))) == [
+        ["Ингредиент", "Количество", "Единица измерения"],
+        ["молоко", "200", "г"], ["мука", "200", "г"], ["сахар", "200", "г"]]
+
+
+def test_download_json(user_client, cart):
+    response, content = download(user_client, format="json")
+    assert response["Content-Type"] == "application/json; charset=utf-8"
+    assert json.loads(content) == [
+        {"name": name, "amount": 200, "measurement_unit": "г"}
+        for name in ("молоко", "мука", "сахар")]
+
+
+def test_download_empty_cart(user_client):
+    response = user_client.get("/api/recipes/download_shopping_cart/")
+    assert response.status_code == 400
@@ -0,0 +1,23 @@
+import pytest
+from django.db import connection
+
+from api import benchmark
+
+pytestmark = pytest.mark.skipif(
+    connection.vendor != "postgresql",
+    reason="Планы запросов проверяются только в PostgreSQL.")
+
+
+def test_routes_use_indexes(benchmark_data):
+    """Запросы маршрутов API не читают большие таблицы целиком.
+
+    На маленькой базе планировщику выгоднее последовательное чтение,
+    поэтому оно отключается: оставшийся Seq Scan значит, что для
+    запроса нет подходящего индекса."""
+
+    with connection.cursor() as cursor:
+        cursor.execute("SET LOCAL enable_seqscan = off")
+    results = benchmark.run(repeat=1, with_explain=True)
+    assert not {
+        name: result["seq_scans"]
+        for name, result in results.items() if result["seq_scans"]}
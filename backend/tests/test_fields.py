@@ -0,0 +1,53 @@
+import base64
+import io
+import os
+
+import pytest
+from PIL import Image
+from rest_framework.exceptions import ValidationError
+
+from api.fields import RecipeImageField
+
+
+def get_error_code(data):
+    with pytest.raises(ValidationError) as error:
+        RecipeImageField().to_internal_value(data)
+    return error.value.detail[0].code
+
+
+@pytest.fixture
+def large_image():
+    """PNG из шума, base64 которого длиннее нескольких частей."""
+
+    buffer = io.BytesIO()
+    Image.frombytes("RGB", (200, 200), os.urandom(200 * 200 * 3)).save(
+        buffer, "PNG")
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("separator", ["\n", "\r\n", " "])
+def test_wrapped_base64_is_accepted(large_image, separator):
+    """Переносы строк не сбивают декодирование по частям."""
+
+    encoded = base64.encodebytes(large_image).decode().replace(
+        "\n", separator)
+    image = RecipeImageField().to_internal_value(
+        "data:image/png;base64," + encoded)
+    assert image.read() == large_image
+
+
+def test_oversize_image_is_rejected(large_image, settings):
+    settings.RECIPE_IMAGE_MAX_SIZE = len(large_image) // 2
+    assert get_error_code("data:image/png;base64," + base64.b64encode(
+        large_image).decode()) == "max_size"
+
+
+@pytest.mark.parametrize("data", [
+    "image/png;base64,AAAA",
+    "data:text/plain;base64,AAAA",
+    "data:image/png,AAAA",
+    "data:image/png;base64," + base64.b64encode(b"not an image").decode(),
+    "data:image/png;base64,not base64!",
+])
+def test_bad_header_is_rejected(data):
+    assert get_error_code(data) == "invalid_image"
@@ -0,0 +1,51 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient
+
+
+@pytest.fixture
+def ingredients(db):
+    return Ingredient.objects.bulk_create(
+        Ingredient(name=name, search_name=name, measurement_unit="г")
+        for name in ("молоко", "кокосовое молоко", "соль", "самолет"))
+
+
+@pytest.mark.parametrize("backend", ["db", "memory"])
+def test_ingredient_search(ingredients, settings, backend):
+    """Сначала названия с запросом в начале, затем с ним в начале слова."""
+
+    settings.INGREDIENT_SEARCH_BACKEND = backend
+    response = APIClient().get("/api/ingredients/", {"name": "Мол"})
+    assert [row["name"] for row in response.json()] == [
+        "молоко", "кокосовое молоко"]
+
+
+@pytest.mark.parametrize("backend", ["db", "memory"])
+def test_ingredient_search_by_words(ingredients, settings, backend):
+    """Каждое слово запроса должно начинать какое-то слово названия."""
+
+    settings.INGREDIENT_SEARCH_BACKEND = backend
+    for name, expected in (("мол кок", ["кокосовое молоко"]),
+                           ("мол сол", []), ("лет", [])):
+        response = APIClient().get("/api/ingredients/", {"name": name})
+        assert [row["name"] for row in response.json()] == expected
+
+
+def test_memory_search_reads_version_once(ingredients, settings):
+    """Построенный индекс отвечает одним запросом версии справочника."""
+
+    settings.INGREDIENT_SEARCH_BACKEND = "memory"
+    APIClient().get("/api/ingredients/", {"name": "мол"})
+    with CaptureQueriesContext(connection) as queries:
+        APIClient().get("/api/ingredients/", {"name": "сол"})
+    assert len(queries) == 1
+
+
+def test_ingredient_detail_ignores_search(ingredients):
+    response = APIClient().get(
+        f"/api/ingredients/{ingredients[0].id}/", {"name": "мол"})
+    assert response.status_code == 200
+    assert response.json()["name"] == "молоко"
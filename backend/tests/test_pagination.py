@@ -0,0 +1,26 @@
+from recipes.models import Recipe, RecipeScore
+
+
+def test_cursor_pages_through_tied_scores(user_client, make_author):
+    """Курсор по оценке листает больше offset_cutoff рецептов
+    с одинаковой оценкой без повторов и пропусков."""
+
+    author = make_author(1)
+    recipes = Recipe.objects.bulk_create(
+        Recipe(name=f"Рецепт {number}", author=author,
+               image="images/recipe.png", text="Описание рецепта",
+               cooking_time=10)
+        for number in range(1300))
+    RecipeScore.objects.bulk_create(
+        RecipeScore(recipe=recipe) for recipe in recipes)
+    url = "/api/recipes/?ordering=trending&cursor=&limit=100"
+    pages = []
+    while url and len(pages) <= 13:
+        response = user_client.get(url).json()
+        pages.append([recipe["id"] for recipe in response["results"]])
+        url = response["next"]
+    recipe_ids = [recipe_id for page in pages for recipe_id in page]
+    assert recipe_ids == sorted(
+        (recipe.id for recipe in recipes), reverse=True)
+    response = user_client.get(response["previous"]).json()
+    assert [recipe["id"] for recipe in response["results"]] == pages[-2]
@@ -0,0 +1,19 @@
+from api.search import PantryIndex
+from recipes.changes import get_recipe_changes_number, log_recipe_changes
+
+
+def test_pantry_index_replays_journal(user, make_recipe, monkeypatch):
+    """Рецепты, записанные в журнал в базе, например другим процессом,
+    попадают в уже построенный индекс без его перестройки."""
+
+    index = PantryIndex()
+    first = make_recipe(user)
+    ingredients = list(first.ingredients.values_list("id", flat=True))
+    assert [found[0] for found in index.search(ingredients, 10)] == [
+        first.id]
+    second = make_recipe(user, "Второй рецепт")
+    log_recipe_changes([second.id])
+    monkeypatch.setattr(index, "build", None)
+    assert [found[0] for found in index.search(ingredients, 10)] == [
+        second.id, first.id]
+    assert index.number == get_recipe_changes_number()
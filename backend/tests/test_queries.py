@@ -0,0 +1,66 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from users.models import Follow
+
+
+def count_queries(client, path, params):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(path, params)
+    assert response.status_code == 200
+    return len(queries)
+
+
+def test_recipe_list_queries_do_not_depend_on_page_size(
+        user, user_client, make_author, make_recipe):
+    """Страница из одного и из многих рецептов разных авторов, на части
+    которых пользователь подписан, читается одним числом запросов."""
+
+    params = {"limit": 50}
+    author = make_author(0)
+    Follow.objects.create(user=user, author=author)
+    make_recipe(author)
+    count_queries(user_client, "/api/recipes/", params)
+    single = count_queries(user_client, "/api/recipes/", params)
+    for number in range(1, 20):
+        author = make_author(number)
+        if number % 2:
+            Follow.objects.create(user=user, author=author)
+        make_recipe(author, f"Рецепт {number}")
+    assert count_queries(user_client, "/api/recipes/", params) == single
+
+
+def test_subscriptions_queries_do_not_depend_on_page_size(
+        user, user_client, make_author, make_recipe):
+    """Подписки на одного и на многих авторов с рецептами читаются
+    одним числом запросов."""
+
+    params = {"limit": 50, "recipes_limit": 3}
+    for number in range(20):
+        author = make_author(number)
+        for index in range(4):
+            make_recipe(author, f"Рецепт {index}")
+        Follow.objects.create(user=user, author=author)
+        if number == 0:
+            count_queries(user_client, "/api/users/subscriptions/", params)
+            single = count_queries(
+                user_client, "/api/users/subscriptions/", params)
+    assert count_queries(
+        user_client, "/api/users/subscriptions/", params) == single
+
+
+def test_user_list_queries_do_not_depend_on_page_size(
+        user, user_client, make_author):
+    """Список из одного и из многих пользователей, на часть которых
+    пользователь подписан, читается одним числом запросов."""
+
+    params = {"limit": 50}
+    count_queries(user_client, "/api/users/", params)
+    single = count_queries(user_client, "/api/users/", params)
+    for number in range(20):
+        author = make_author(number)
+        if number % 2:
+            Follow.objects.create(user=user, author=author)
+    assert count_queries(user_client, "/api/users/", params) == single
+    response = user_client.get("/api/users/", params).json()
+    assert sum(item["is_subscribed"] for item in response["results"]) == 10
@@ -0,0 +1,10 @@
+from api import benchmark
+
+
+def test_query_budget(benchmark_data):
+    """Число запросов к БД каждого маршрута не превышает бюджет."""
+
+    results = benchmark.run(repeat=1)
+    budget = benchmark.load_budget()
+    assert set(results) <= set(budget), "Маршруты без бюджета"
+    assert not benchmark.find_regressions(results, budget)
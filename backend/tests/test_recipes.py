@@ -0,0 +1,94 @@
+import pytest
+from rest_framework.test import APIClient
+
+from api import serializers
+from recipes import toggles
+from recipes.models import Recipe, RecipeChange
+from recipes.search import update_search_vectors
+
+
+@pytest.fixture
+def recipe_data(user, make_recipe, image_data):
+    recipe = make_recipe(user)
+    return {
+        "name": "Новый рецепт", "text": "Описание", "cooking_time": 5,
+        "image": image_data, "tags": [recipe.tags.first().id],
+        "ingredients": [{"id": recipe.ingredients.first().id, "amount": 1}],
+    }
+
+
+def test_create_recipe(user_client, recipe_data, settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    response = user_client.post("/api/recipes/", recipe_data, format="json")
+    assert response.status_code == 201
+    assert RecipeChange.objects.filter(
+        recipe=response.json()["id"]).exists()
+
+
+def test_failed_create_is_rolled_back(
+        user_client, recipe_data, settings, tmp_path, monkeypatch):
+    """Если раскладка по лентам падает, рецепт не остается в базе."""
+
+    settings.MEDIA_ROOT = tmp_path
+
+    def fail(recipes):
+        raise RuntimeError
+
+    monkeypatch.setattr(serializers.timeline, "push", fail)
+    with pytest.raises(RuntimeError):
+        user_client.post("/api/recipes/", recipe_data, format="json")
+    assert not Recipe.objects.filter(name="Новый рецепт").exists()
+
+
+def test_tags_filter(user_client, user, make_recipe):
+    """Теги фильтруются по слагам через OR без дублей, неизвестные
+    слаги ничего не находят."""
+
+    recipe = make_recipe(user)
+    slugs = list(recipe.tags.values_list("slug", flat=True))
+    response = user_client.get("/api/recipes/", {"tags": slugs}).json()
+    assert [item["id"] for item in response["results"]] == [recipe.id]
+    response = user_client.get("/api/recipes/", {"tags": "unknown"})
+    assert response.status_code == 200
+    assert response.json()["results"] == []
+
+
+def test_list_flags(user_client, user, make_recipe):
+    """Флаги избранного и корзины считаются для всей страницы, аноним
+    получает False."""
+
+    favorite, in_cart = make_recipe(user), make_recipe(user, "В корзине")
+    toggles.add_favorites(user.id, [favorite.id])
+    toggles.add_to_shopping_cart(user.id, [in_cart.id])
+    flags = {
+        item["id"]: (item["is_favorited"], item["is_in_shopping_cart"])
+        for item in user_client.get("/api/recipes/").json()["results"]}
+    assert flags == {favorite.id: (True, False), in_cart.id: (False, True)}
+    assert {
+        (item["is_favorited"], item["is_in_shopping_cart"])
+        for item in APIClient().get("/api/recipes/").json()["results"]} == {
+        (False, False)}
+    response = user_client.get(f"/api/recipes/{in_cart.id}/").json()
+    assert (response["is_favorited"], response["is_in_shopping_cart"]) == (
+        False, True)
+
+
+def test_search_ranks_name_above_text(user_client, user, make_recipe):
+    """Совпадение в названии выше совпадения в описании, исключения
+    и фильтр по тегам работают вместе с поиском."""
+
+    in_text = make_recipe(user, "Блины")
+    Recipe.objects.filter(pk=in_text.pk).update(text="Подавать с творогом")
+    in_name = make_recipe(user, "Творог с медом")
+    other = make_recipe(user, "Омлет")
+    update_search_vectors(Recipe.objects.all())
+
+    def search(**params):
+        response = user_client.get("/api/recipes/", params).json()
+        return [item["id"] for item in response["results"]]
+
+    assert search(search="творог") == [in_name.id, in_text.id]
+    assert search(search="молоко -творог") == [other.id]
+    assert search(search="творог", tags="breakfast") == [
+        in_name.id, in_text.id]
+    assert search(search="творог", tags="unknown") == []
@@ -0,0 +1,16 @@
+from recipes import shopping_list, toggles
+from recipes.models import ShoppingListItem
+
+
+def test_author_deletion_updates_shopping_lists(
+        user, make_author, make_recipe):
+    """Рецепты, удаленные каскадом вместе с автором, вычитаются из
+    списков покупок других пользователей."""
+
+    author = make_author(0)
+    kept = make_recipe(user)
+    toggles.add_to_shopping_cart(user.id, [kept.id, make_recipe(author).id])
+    author.delete()
+    assert not list(shopping_list.find_mismatches())
+    assert set(ShoppingListItem.objects.values_list("total", flat=True)) == {
+        100}
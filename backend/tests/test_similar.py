@@ -0,0 +1,46 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from recipes.models import IngredientRecipe, SimilarRecipe
+
+
+@pytest.fixture
+def recipes(user, make_recipe):
+    """Рецепт, такой же по составу, частично похожий и непохожий."""
+
+    target, close = make_recipe(user), make_recipe(user, "Близкий")
+    far, other = make_recipe(user, "Дальний"), make_recipe(user, "Другой")
+    IngredientRecipe.objects.filter(recipe=far).exclude(
+        ingredient__name="мука").delete()
+    IngredientRecipe.objects.filter(recipe=other).delete()
+    other.tags.clear()
+    return target, close, far, other
+
+
+def get_similar(client, recipe):
+    response = client.get(f"/api/recipes/{recipe.id}/similar/")
+    assert response.status_code == 200
+    return [item["id"] for item in response.json()]
+
+
+def test_similar_fallback(user_client, recipes):
+    """Без расчета похожие ищутся по числу общих ингредиентов."""
+
+    target, close, far, _ = recipes
+    assert get_similar(user_client, target) == [close.id, far.id]
+
+
+def test_similar_precomputed(user_client, recipes):
+    target, close, far, other = recipes
+    call_command("similar_recipes", stdout=StringIO())
+    assert SimilarRecipe.objects.filter(recipe=target).exists()
+    similar = get_similar(user_client, target)
+    assert similar[:2] == [close.id, far.id]
+    assert other.id not in similar
+
+
+def test_similar_missing_recipe(user_client):
+    response = user_client.get("/api/recipes/1000000/similar/")
+    assert response.status_code == 404
@@ -0,0 +1,30 @@
+from recipes import timeline
+from recipes.models import TimelineEntry
+from users.models import Follow
+
+
+def test_push_trims_feeds(settings, user, make_author, make_recipe):
+    """Лента подписчика обрезается до FEED_SIZE записей при раскладке."""
+
+    settings.FEED_SIZE = 3
+    author = make_author(1)
+    Follow.objects.create(user=user, author=author)
+    recipe_ids = []
+    for number in range(5):
+        recipe = make_recipe(author, f"Рецепт {number}")
+        timeline.push([recipe])
+        recipe_ids.append(recipe.id)
+    assert sorted(TimelineEntry.objects.filter(user=user).values_list(
+        "recipe_id", flat=True)) == recipe_ids[-3:]
+
+
+def test_push_skips_existing_entries(user, make_author, make_recipe):
+    """Запись, уже добавленная подпиской, не мешает раскладке."""
+
+    author = make_author(1)
+    Follow.objects.create(user=user, author=author)
+    recipe = make_recipe(author)
+    timeline.backfill(user.id, [author.id])
+    timeline.push([recipe])
+    assert list(TimelineEntry.objects.filter(user=user).values_list(
+        "recipe_id", flat=True)) == [recipe.id]
@@ -0,0 +1,152 @@
+from recipes import shopping_list
+from recipes.models import Favorite, Recipe, ShoppingListItem
+from users.models import Follow, User
+
+
+def get_totals(user):
+    return set(ShoppingListItem.objects.filter(user=user).values_list(
+        "total", flat=True))
+
+
+def test_favorite(user_client, user, make_recipe):
+    """Повторное добавление дает 400, повторное удаление - 404,
+    счетчик избранного меняется вместе со связью."""
+
+    recipe = make_recipe(user)
+    url = f"/api/recipes/{recipe.id}/favorite/"
+    response = user_client.post(url)
+    assert response.status_code == 201
+    assert response.json()["id"] == recipe.id
+    assert user_client.post(url).status_code == 400
+    assert Recipe.objects.get(pk=recipe.pk).favorites_count == 1
+    assert user_client.delete(url).status_code == 204
+    assert user_client.delete(url).status_code == 404
+    assert Recipe.objects.get(pk=recipe.pk).favorites_count == 0
+    assert not Favorite.objects.exists()
+
+
+def test_favorite_missing_recipe(user_client):
+    assert user_client.post("/api/recipes/1000000/favorite/").status_code == (
+        404)
+    assert user_client.delete(
+        "/api/recipes/1000000/favorite/").status_code == 404
+
+
+def test_shopping_cart(user_client, user, make_recipe):
+    """Список покупок пересчитывается при добавлении и удалении."""
+
+    first, second = make_recipe(user), make_recipe(user, "Второй")
+    for recipe in (first, second):
+        response = user_client.post(f"/api/recipes/{recipe.id}/shopping_cart/")
+        assert response.status_code == 201
+    assert get_totals(user) == {200}
+    assert user_client.post(
+        f"/api/recipes/{first.id}/shopping_cart/").status_code == 400
+    assert get_totals(user) == {200}
+    assert user_client.delete(
+        f"/api/recipes/{first.id}/shopping_cart/").status_code == 204
+    assert get_totals(user) == {100}
+    assert user_client.delete(
+        f"/api/recipes/{first.id}/shopping_cart/").status_code == 404
+    assert user_client.delete(
+        f"/api/recipes/{second.id}/shopping_cart/").status_code == 204
+    assert not ShoppingListItem.objects.exists()
+    assert not list(shopping_list.find_mismatches())
+    assert user_client.post(
+        "/api/recipes/1000000/shopping_cart/").status_code == 404
+
+
+def test_subscribe(user_client, user, make_author):
+    """Подписка на себя и повторная подписка дают 400, отписка, как и
+    раньше, идемпотентна. Счетчик подписчиков меняется вместе с
+    подпиской."""
+
+    author = make_author(1)
+    url = f"/api/users/{author.id}/subscribe/"
+    response = user_client.post(url)
+    assert response.status_code == 201
+    assert response.json()["is_subscribed"] is True
+    assert user_client.post(url).status_code == 400
+    assert user_client.post(
+        f"/api/users/{user.id}/subscribe/").status_code == 400
+    assert user_client.post(
+        "/api/users/1000000/subscribe/").status_code == 404
+    assert User.objects.get(pk=author.pk).followers_count == 1
+    assert user_client.delete(url).status_code == 204
+    assert user_client.delete(url).status_code == 204
+    assert user_client.delete(
+        "/api/users/1000000/subscribe/").status_code == 404
+    assert User.objects.get(pk=author.pk).followers_count == 0
+    assert not Follow.objects.exists()
+
+
+def test_bulk_favorite(user_client, user, make_recipe):
+    """Пакетное добавление и удаление возвращают результат для каждого
+    id без повторов, счетчики меняются один раз."""
+
+    first, second = make_recipe(user), make_recipe(user, "Второй")
+    ids = [first.id, first.id, second.id, 1000000]
+    response = user_client.post(
+        "/api/recipes/favorite/", {"ids": ids}, format="json")
+    assert response.status_code == 200
+    assert response.json()["results"] == [
+        {"id": first.id, "status": "added"},
+        {"id": second.id, "status": "added"},
+        {"id": 1000000, "status": "not_found"}]
+    assert set(Recipe.objects.values_list("favorites_count", flat=True)) == {
+        1}
+    response = user_client.post(
+        "/api/recipes/favorite/", {"ids": [first.id]}, format="json")
+    assert response.json()["results"] == [
+        {"id": first.id, "status": "already_added"}]
+    response = user_client.delete(
+        "/api/recipes/favorite/", {"ids": ids}, format="json")
+    assert response.json()["results"] == [
+        {"id": first.id, "status": "removed"},
+        {"id": second.id, "status": "removed"},
+        {"id": 1000000, "status": "not_found"}]
+    assert set(Recipe.objects.values_list("favorites_count", flat=True)) == {
+        0}
+
+
+def test_bulk_shopping_cart(user_client, user, make_recipe):
+    first, second = make_recipe(user), make_recipe(user, "Второй")
+    user_client.post("/api/recipes/shopping_cart/",
+                     {"ids": [first.id, second.id, first.id]}, format="json")
+    assert get_totals(user) == {200}
+    response = user_client.delete(
+        "/api/recipes/shopping_cart/", {"ids": [second.id]}, format="json")
+    assert response.json()["results"] == [
+        {"id": second.id, "status": "removed"}]
+    assert get_totals(user) == {100}
+    assert not list(shopping_list.find_mismatches())
+
+
+def test_bulk_subscribe(user_client, user, make_author):
+    """На себя подписаться нельзя, такой id считается ненайденным."""
+
+    authors = [make_author(number) for number in range(2)]
+    ids = [author.id for author in authors] + [user.id]
+    response = user_client.post(
+        "/api/users/subscribe/", {"ids": ids}, format="json")
+    assert response.json()["results"] == [
+        {"id": authors[0].id, "status": "added"},
+        {"id": authors[1].id, "status": "added"},
+        {"id": user.id, "status": "not_found"}]
+    assert set(User.objects.filter(
+        id__in=ids[:2]).values_list("followers_count", flat=True)) == {1}
+    response = user_client.delete(
+        "/api/users/subscribe/", {"ids": ids[:1]}, format="json")
+    assert response.json()["results"] == [
+        {"id": authors[0].id, "status": "removed"}]
+    assert Follow.objects.get().author == authors[1]
+
+
+def test_bulk_ids_limit(user_client, settings):
+    ids = list(range(1, settings.BULK_MAX_IDS + 2))
+    for url in ("/api/recipes/favorite/", "/api/recipes/shopping_cart/",
+                "/api/users/subscribe/"):
+        response = user_client.post(url, {"ids": ids}, format="json")
+        assert response.status_code == 400
+        response = user_client.post(url, {"ids": []}, format="json")
+        assert response.status_code == 400
@@ -0,0 +1,27 @@
+import json
+
+import pytest
+
+from api import transfer
+
+
+def test_failed_chunk_removes_saved_images(
+        user, make_recipe, image_data, settings, tmp_path, monkeypatch):
+    """Изображения пачки удаляются, если ее транзакция откатилась."""
+
+    settings.MEDIA_ROOT = tmp_path
+    recipe = make_recipe(user)
+    line = json.dumps({
+        "name": "Импорт", "text": "Описание", "cooking_time": 5,
+        "image": image_data, "tags": [recipe.tags.first().id],
+        "ingredients": [{"id": recipe.ingredients.first().id, "amount": 1}],
+    })
+
+    def fail(recipes):
+        raise RuntimeError
+
+    monkeypatch.setattr(transfer.timeline, "push", fail)
+    with pytest.raises(RuntimeError):
+        transfer.import_chunk(
+            [(1, line), (2, line)], transfer.load_catalog(), user.id)
+    assert not list(tmp_path.rglob("*.*"))
@@ -18,15 +18,6 @@ class UserAdmin(admin.ModelAdmin):
         "recipes_count",)
     list_filter = ("username", "email",)
 
-    def followers_count(self, obj):
-        return obj.follower.count()
-
-    def recipes_count(self, obj):
-        return obj.recipes.count()
-
-    followers_count.short_description = "Подписчики"
-    recipes_count.short_description = "Рецепты"
-
 
 @admin.register(Follow)
 class FollowAdmin(admin.ModelAdmin):
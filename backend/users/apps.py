@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
+
+    def ready(self):
+        from users import signals
+        from users.models import Follow
+
+        post_save.connect(signals.increment_followers_count, sender=Follow)
+        post_delete.connect(signals.decrement_followers_count, sender=Follow)
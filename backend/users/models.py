@@ -28,6 +28,14 @@ class User(AbstractUser):
         verbose_name="Электронная почта",
         unique=True,
         default="example@mail.com",)
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Рецепты",)
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Подписчики",)
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["username", "first_name", "last_name", ]
@@ -36,6 +44,10 @@ class User(AbstractUser):
         ordering = ['username', ]
         verbose_name = "Пользователь"
         verbose_name_plural = "Пользователи"
+        indexes = [
+            models.Index(
+                fields=("followers_count",),
+                name="user_followers_count_idx"), ]
 
     def __str__(self):
         return self.username
@@ -48,12 +60,14 @@ class Follow(models.Model):
         User,
         on_delete=models.CASCADE,
         verbose_name="Подписчик",
-        related_name="follower",)
+        related_name="follower",
+        db_index=False,)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
         verbose_name="Автор",
-        related_name="following",)
+        related_name="following",
+        db_index=False,)
 
     class Meta:
         ordering = ["user", ]
@@ -63,6 +77,10 @@ class Follow(models.Model):
             models.UniqueConstraint(
                 fields=("user", "author"),
                 name="unique_follow"), ]
+        indexes = [
+            models.Index(
+                fields=("author", "user"),
+                name="follow_author_user_idx"), ]
 
     def clean(self):
         if self.user == self.author:
@@ -0,0 +1,14 @@
+from django.db.models import F
+
+from users.models import User
+
+
+def increment_followers_count(sender, instance, created, **kwargs):
+    if created:
+        User.objects.filter(pk=instance.author_id).update(
+            followers_count=F("followers_count") + 1)
+
+
+def decrement_followers_count(sender, instance, **kwargs):
+    User.objects.filter(pk=instance.author_id).update(
+        followers_count=F("followers_count") - 1)
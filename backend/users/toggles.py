@@ -0,0 +1,76 @@
+from django.db import connection, transaction
+
+from recipes import timeline
+from users.models import Follow, User
+
+USER = User._meta.db_table
+FOLLOW = Follow._meta.db_table
+
+FOLLOW_SQL = (
+    "WITH added AS ("
+    f"INSERT INTO {FOLLOW} (user_id, author_id) "
+    f"SELECT %(user)s, id FROM {USER} "
+    "WHERE id = ANY(%(ids)s) AND id <> %(user)s "
+    "ON CONFLICT DO NOTHING RETURNING author_id), "
+    f"counted AS (UPDATE {USER} SET followers_count = followers_count + 1 "
+    "WHERE id IN (SELECT author_id FROM added)) "
+    f"SELECT {USER}.* FROM {USER} "
+    f"JOIN added ON {USER}.id = added.author_id ORDER BY {USER}.id")
+UNFOLLOW_SQL = (
+    "WITH removed AS ("
+    f"DELETE FROM {FOLLOW} "
+    "WHERE user_id = %(user)s AND author_id = ANY(%(ids)s) "
+    "RETURNING author_id), "
+    f"counted AS (UPDATE {USER} SET followers_count = followers_count - 1 "
+    "WHERE id IN (SELECT author_id FROM removed)) "
+    "SELECT author_id FROM removed")
+
+
+def follow(user_id, author_ids):
+    """Подписывает пользователя на авторов.
+
+    В PostgreSQL это один запрос INSERT ... ON CONFLICT DO NOTHING вместе
+    с обновлением счетчика подписчиков. Возвращает авторов, на которых
+    пользователь подписался сейчас; существующие подписки, подписка на
+    себя и несуществующие авторы пропускаются. Последние рецепты новых
+    авторов добавляются в ленту пользователя."""
+
+    author_ids = [int(author_id) for author_id in author_ids]
+    if connection.vendor == "postgresql":
+        authors = list(User.objects.raw(
+            FOLLOW_SQL, {"user": user_id, "ids": author_ids}))
+    else:
+        with transaction.atomic():
+            existing = Follow.objects.filter(
+                user_id=user_id, author_id__in=author_ids).values(
+                "author_id")
+            authors = list(User.objects.filter(id__in=author_ids).exclude(
+                id__in=existing).exclude(id=user_id))
+            for author in authors:
+                Follow.objects.create(user_id=user_id, author=author)
+    if authors:
+        timeline.backfill(user_id, [author.id for author in authors])
+    return authors
+
+
+def unfollow(user_id, author_ids):
+    """Отписывает пользователя от авторов одним DELETE ... RETURNING.
+
+    Возвращает id авторов, от которых пользователь действительно
+    отписался, их рецепты убираются из ленты."""
+
+    author_ids = [int(author_id) for author_id in author_ids]
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(UNFOLLOW_SQL, {"user": user_id, "ids": author_ids})
+            removed = [author_id for author_id, in cursor.fetchall()]
+    else:
+        with transaction.atomic():
+            follows = list(Follow.objects.filter(
+                user_id=user_id, author_id__in=author_ids))
+            for obj in follows:
+                obj.delete()
+        removed = [obj.author_id for obj in follows]
+    if removed:
+        timeline.remove_authors(user_id, removed)
+    return removed
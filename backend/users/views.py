@@ -5,19 +5,22 @@ from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from api.paginators import PageLimitPagination
+from api.mixins import BulkToggleMixin
+from api.paginators import PageOrCursorPagination
 from api.serializers import (CreateUserSerializer, CustomUserSerializer,
                              FollowSerializer)
+from users import toggles
 from users.models import Follow, User
 
 
-class CustomUserViewSet(UserViewSet):
+class CustomUserViewSet(BulkToggleMixin, UserViewSet):
     """Вьюсет для модели пользователя."""
 
     queryset = User.objects.all()
     serializer_class = CustomUserSerializer
-    pagination_class = PageLimitPagination
+    pagination_class = PageOrCursorPagination
     permission_classes = (IsAuthenticated, )
+    lookup_value_regex = r"\d+"
 
     def get_serializer_class(self):
         method = self.request.method
@@ -25,6 +28,18 @@ class CustomUserViewSet(UserViewSet):
             return CreateUserSerializer
         return CustomUserSerializer
 
+    def get_serializer_context(self):
+        """Добавляет в контекст списка id авторов, на которых подписан
+        пользователь, чтобы не проверять подписку для каждого из них."""
+
+        context = super().get_serializer_context()
+        user = self.request.user
+        if self.action == "list" and user.is_authenticated:
+            context["subscriptions"] = set(
+                Follow.objects.filter(user=user).values_list(
+                    "author_id", flat=True))
+        return context
+
     @action(detail=False, methods=["GET"],
             permission_classes=[IsAuthenticated], )
     def me(self, request):
@@ -38,31 +53,38 @@ class CustomUserViewSet(UserViewSet):
             User.objects.filter(following__user=request.user))
         serializer = FollowSerializer(
             follows, many=True,
-            context={"request": request})
+            context={"request": request,
+                     "recipes": FollowSerializer.get_latest_recipes(
+                         follows, request)})
         return self.get_paginated_response(serializer.data)
 
     @action(detail=True, methods=["POST", "DELETE"],
             permission_classes=[IsAuthenticated], )
     def subscribe(self, request, *args, **kwargs):
-        user = get_object_or_404(User, username=request.user)
-        author = get_object_or_404(User, id=self.kwargs.get('id'))
-        follow_queryset = Follow.objects.filter(
-            author=author, user=user)
-        follow_exists = follow_queryset.exists()
-        if request.method == "POST":
-            if follow_exists:
-                return Response(
-                    {"errors": "Нельзя 2 раза подписаться на одного автора!"},
-                    status=status.HTTP_400_BAD_REQUEST)
-            if user == author:
-                return Response(
-                    {"errors": "Нельзя подписаться на самого себя!"},
-                    status=status.HTTP_400_BAD_REQUEST)
-            serializer = FollowSerializer(
-                author, data=request.data, context={'request': request})
-            serializer.is_valid(raise_exception=True)
-            Follow.objects.create(user=user, author=author)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        user = request.user
+        author_id = int(self.kwargs["id"])
         if request.method == "DELETE":
-            follow_queryset.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+            if not toggles.unfollow(user.id, [author_id]):
+                get_object_or_404(User, id=author_id)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        if author_id == user.id:
+            return Response(
+                {"errors": "Нельзя подписаться на самого себя!"},
+                status=status.HTTP_400_BAD_REQUEST)
+        authors = toggles.follow(user.id, [author_id])
+        if not authors:
+            get_object_or_404(User, id=author_id)
+            return Response(
+                {"errors": "Нельзя 2 раза подписаться на одного автора!"},
+                status=status.HTTP_400_BAD_REQUEST)
+        serializer = FollowSerializer(
+            authors[0], context={"request": request})
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=["POST", "DELETE"],
+            permission_classes=[IsAuthenticated],
+            url_path="subscribe", url_name="subscribe-bulk")
+    def subscribe_bulk(self, request):
+        return self.bulk_toggle(
+            request, User.objects.exclude(id=request.user.id),
+            toggles.follow, toggles.unfollow)